@@ -0,0 +1,72 @@
+"""Measure the memory retained by many parsed control structures.
+
+Every example diagram is parsed ``--copies`` times, as when many diagrams
+sharing entity names are loaded at once, and a synthetic diagram is
+parsed as well::
+
+    python benchmarks/memory.py --copies 200 --levels 50 --width 50
+"""
+
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from tracemalloc import get_traced_memory, start, stop
+
+from synthetic import write_synthetic_diagram
+
+from stpa.control_structures import ControlStructure
+
+EXAMPLES = Path(__file__).parents[1] / 'stpa' / 'examples'
+
+
+def measure(name: str, paths: list[Path]) -> None:
+    start()
+
+    begin = perf_counter()
+    control_structures = list(map(ControlStructure.parse_diagram, paths))
+    wall_time = perf_counter() - begin
+    retained, peak = get_traced_memory()
+
+    stop()
+
+    entity_count = sum(
+        len(control_structure.entities)
+        for control_structure in control_structures
+    )
+    edge_count = sum(
+        len(control_structure.control_actions_or_feedbacks)
+        for control_structure in control_structures
+    )
+
+    print(
+        f'{name:>10}'
+        f' {retained / 2 ** 20:8.2f} MiB retained'
+        f' {peak / 2 ** 20:8.2f} MiB peak'
+        f' {wall_time:7.3f} s'
+        f' {entity_count:7} entities'
+        f' {edge_count:7} edges',
+    )
+
+
+def main() -> None:
+    parser = ArgumentParser()
+
+    parser.add_argument('--copies', type=int, default=200)
+    parser.add_argument('--levels', type=int, default=50)
+    parser.add_argument('--width', type=int, default=50)
+
+    args = parser.parse_args()
+    paths = sorted(EXAMPLES.glob('**/*.drawio.xml'))
+
+    measure('examples', paths * args.copies)
+
+    with TemporaryDirectory() as directory:
+        path = Path(directory) / 'synthetic.drawio.xml'
+
+        write_synthetic_diagram(path, args.levels, args.width)
+        measure('synthetic', [path] * 4)
+
+
+if __name__ == '__main__':
+    main()
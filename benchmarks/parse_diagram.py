@@ -0,0 +1,205 @@
+"""Compare wall time and peak RSS of the ``parse_diagram`` modes.
+
+The ``baseline`` mode runs a copy of the original parser, which parsed the
+whole tree and resolved the cells in three passes over a dict of elements.
+Every mode runs in a fresh interpreter so that ``ru_maxrss`` reflects that
+mode alone::
+
+    python benchmarks/parse_diagram.py --levels 100 --width 100
+"""
+
+from argparse import ArgumentParser
+from pathlib import Path
+from resource import getrusage, RUSAGE_SELF
+from subprocess import run
+from sys import executable
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import xml.etree.ElementTree as ET
+
+from bs4 import BeautifulSoup
+from synthetic import write_synthetic_diagram
+
+from stpa.control_structures import (
+    CELL_TAG_NAME,
+    CONTROL_STRUCTURE_PARENT,
+    ControlActionOrFeedback,
+    ControlStructure,
+    ControlType,
+    Entity,
+    GEOMETRY_TAG_NAME,
+)
+
+MODES = 'baseline', 'tree', 'streaming'
+
+
+def get_baseline_control_type(
+        source_cell: ET.Element,
+        target_cell: ET.Element,
+) -> ControlType:
+    source_geometry = source_cell.find(GEOMETRY_TAG_NAME)
+    target_geometry = target_cell.find(GEOMETRY_TAG_NAME)
+
+    assert source_geometry is not None
+    assert target_geometry is not None
+
+    source_x = int(source_geometry.attrib['x'])
+    source_y = int(source_geometry.attrib['y'])
+    source_height = int(source_geometry.attrib['height'])
+    target_x = int(target_geometry.attrib['x'])
+    target_y = int(target_geometry.attrib['y'])
+    target_height = int(source_geometry.attrib['height'])
+    status = False
+
+    if (
+            source_y <= target_y <= source_y + source_height
+            or target_y <= source_y <= target_y + target_height
+    ):
+        status = source_x < target_x
+    else:
+        status = source_y < target_y
+
+    return ControlType.ACTION if status else ControlType.FEEDBACK
+
+
+def parse_baseline_diagram(source: Path) -> ControlStructure:
+    tree = ET.parse(source)
+    root = tree.getroot()[0][0][0]
+    cells = {}
+    cleaned_values = {}
+
+    for cell in root.findall(CELL_TAG_NAME):
+        id_ = cell.attrib['id']
+        cells[id_] = cell
+
+        if 'value' in cell.attrib:
+            value = cell.attrib['value']
+            soup = BeautifulSoup(value, 'html.parser')
+            cleaned_value = soup.get_text(strip=True)
+            cleaned_values[id_] = cleaned_value
+
+    entities = {}
+    parent_cleaned_values = {}
+
+    for cell in cells.values():
+        id_ = cell.attrib['id']
+        cleaned_value = cleaned_values.get(id_, '')
+        parent = cell.attrib.get('parent', '')
+
+        if cleaned_value:
+            if parent == CONTROL_STRUCTURE_PARENT:
+                entities[id_] = Entity(cleaned_value)
+            else:
+                parent_cleaned_values[parent] = cleaned_value
+
+    control_actions_or_feedbacks = []
+
+    for cell in cells.values():
+        if (
+                cell.attrib.get('edge') == '1'
+                and 'source' in cell.attrib
+                and 'target' in cell.attrib
+        ):
+            id_ = cell.attrib['id']
+            cleaned_value = parent_cleaned_values.get(id_, '')
+            source_cell = cells[cell.attrib['source']]
+            target_cell = cells[cell.attrib['target']]
+
+            if cleaned_value.lower().startswith('action'):
+                control_type = ControlType.ACTION
+            elif cleaned_value.lower().startswith('feedback'):
+                control_type = ControlType.FEEDBACK
+            else:
+                control_type = get_baseline_control_type(
+                    source_cell,
+                    target_cell,
+                )
+
+            source_entity = entities[cell.attrib['source']]
+            target_entity = entities[cell.attrib['target']]
+
+            match control_type:
+                case ControlType.ACTION:
+                    controller, controlled = source_entity, target_entity
+                case ControlType.FEEDBACK:
+                    controller, controlled = target_entity, source_entity
+                case _:
+                    raise ValueError(
+                        f'unknown control type {repr(control_type)}',
+                    )
+
+            control_action_or_feedback = ControlActionOrFeedback(
+                cleaned_value,
+                control_type,
+                controller,
+                controlled,
+            )
+
+            control_actions_or_feedbacks.append(control_action_or_feedback)
+
+    return ControlStructure(
+        frozenset(entities.values()),
+        frozenset(control_actions_or_feedbacks),
+    )
+
+
+def measure(mode: str, path: Path) -> None:
+    start = perf_counter()
+
+    if mode == 'baseline':
+        control_structure = parse_baseline_diagram(path)
+    else:
+        control_structure = ControlStructure.parse_diagram(
+            path,
+            mode == 'streaming',
+        )
+
+    wall_time = perf_counter() - start
+    peak_rss = getrusage(RUSAGE_SELF).ru_maxrss / 1024
+
+    print(
+        f'{mode:>10}'
+        f' {wall_time:8.3f} s'
+        f' {peak_rss:8.1f} MiB'
+        f' {len(control_structure.entities):7} entities'
+        f' {len(control_structure.control_actions_or_feedbacks):7} edges',
+    )
+
+
+def main() -> None:
+    parser = ArgumentParser()
+
+    parser.add_argument('--levels', type=int, default=100)
+    parser.add_argument('--width', type=int, default=100)
+    parser.add_argument('--measure', choices=MODES)
+    parser.add_argument('--path', type=Path)
+
+    args = parser.parse_args()
+
+    if args.measure is not None:
+        measure(args.measure, args.path)
+
+        return
+
+    with TemporaryDirectory() as directory:
+        path = Path(directory) / 'synthetic.drawio.xml'
+
+        write_synthetic_diagram(path, args.levels, args.width)
+        print(f'{path.stat().st_size / 2 ** 20:.1f} MiB diagram')
+
+        for mode in MODES:
+            run(
+                [
+                    executable,
+                    __file__,
+                    '--measure',
+                    mode,
+                    '--path',
+                    str(path),
+                ],
+                check=True,
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Measure the throughput of ``parse_diagrams`` for several worker counts.
+
+The directory is filled with copies of the example diagrams and with
+synthetic diagrams of a few hundred cells::
+
+    python benchmarks/parse_diagrams.py --copies 50
+"""
+
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from synthetic import write_synthetic_diagram
+
+from stpa.control_structures import ControlStructure
+
+EXAMPLES = Path(__file__).parents[1] / 'stpa' / 'examples'
+
+
+def main() -> None:
+    parser = ArgumentParser()
+
+    parser.add_argument('--copies', type=int, default=50)
+    parser.add_argument('--chunk-size', type=int, default=4)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as directory:
+        paths = sorted(EXAMPLES.glob('**/*.drawio.xml'))
+
+        for copy in range(args.copies):
+            for path in paths:
+                copy_path = Path(directory) / f'{copy}-{path.name}'
+
+                copy_path.write_bytes(path.read_bytes())
+
+            write_synthetic_diagram(
+                Path(directory) / f'{copy}-synthetic.drawio.xml',
+                10,
+                10,
+            )
+
+        count = args.copies * (len(paths) + 1)
+
+        for max_workers in args.workers:
+            start = perf_counter()
+
+            for _, result in ControlStructure.parse_diagrams(
+                    directory,
+                    max_workers=max_workers,
+                    chunk_size=args.chunk_size,
+            ):
+                assert isinstance(result, ControlStructure)
+
+            wall_time = perf_counter() - start
+
+            print(
+                f'{max_workers:2} workers'
+                f' {count:5} files'
+                f' {wall_time:7.3f} s'
+                f' {count / wall_time:8.1f} files/s',
+            )
+
+
+if __name__ == '__main__':
+    main()
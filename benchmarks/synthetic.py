@@ -0,0 +1,114 @@
+from pathlib import Path
+from xml.sax.saxutils import quoteattr
+
+HEADER = (
+    '<mxfile host="app.diagrams.net">\n'
+    '  <diagram name="Page-1" id="synthetic">\n'
+    '    <mxGraphModel dx="1136" dy="616" grid="1" gridSize="10">\n'
+    '      <root>\n'
+    '        <mxCell id="0" />\n'
+    '        <mxCell id="1" parent="0" />\n'
+)
+FOOTER = (
+    '      </root>\n'
+    '    </mxGraphModel>\n'
+    '  </diagram>\n'
+    '</mxfile>\n'
+)
+VERTEX = (
+    '        <mxCell id="v{index}" value={value} style="rounded=0;'
+    'whiteSpace=wrap;html=1;" parent="1" vertex="1">\n'
+    '          <mxGeometry x="{x}" y="{y}" width="120" height="60"'
+    ' as="geometry" />\n'
+    '        </mxCell>\n'
+)
+EDGE = (
+    '        <mxCell id="e{index}" style="edgeStyle=orthogonalEdgeStyle;'
+    'rounded=0;html=1;exitX={exit_x};exitY={exit_y};entryX={entry_x};'
+    'entryY={entry_y};" parent="1" source="v{source}" target="v{target}"'
+    ' edge="1">\n'
+    '          <mxGeometry relative="1" as="geometry">\n'
+    '            <Array as="points">\n'
+    '              <mxPoint x="{x}" y="{y}" />\n'
+    '            </Array>\n'
+    '          </mxGeometry>\n'
+    '        </mxCell>\n'
+)
+LABEL = (
+    '        <mxCell id="l{index}" value={value} style="edgeLabel;html=1;'
+    'align=right;verticalAlign=middle;" parent="e{index}" vertex="1"'
+    ' connectable="0">\n'
+    '          <mxGeometry x="0.25" y="3" relative="1" as="geometry">\n'
+    '            <mxPoint as="offset" />\n'
+    '          </mxGeometry>\n'
+    '        </mxCell>\n'
+)
+ENTITY_VALUES = (
+    'Controller {}',
+    '<div>Controlled Process {}</div>',
+    '<p style="line-height: 120%;">Subsystem {}</p>',
+)
+LABEL_VALUES = (
+    'Command {}',
+    '<div>Arm and Set,&nbsp;<div>Disarm,&nbsp;</div></div>',
+    'Status',
+    '',
+)
+
+
+def write_synthetic_diagram(path: Path, levels: int, width: int) -> None:
+    with open(path, 'w') as file:
+        file.write(HEADER)
+
+        for level in range(levels):
+            for column in range(width):
+                index = level * width + column
+                value = ENTITY_VALUES[index % len(ENTITY_VALUES)]
+
+                file.write(
+                    VERTEX.format(
+                        index=index,
+                        value=quoteattr(value.format(index)),
+                        x=column * 200,
+                        y=level * 150,
+                    ),
+                )
+
+        edge_index = 0
+
+        for level in range(levels - 1):
+            for column in range(width):
+                upper = level * width + column
+                lower = upper + width
+
+                for source, target, exit_y in (
+                        (upper, lower, 1),
+                        (lower, upper, 0),
+                ):
+                    value = LABEL_VALUES[edge_index % len(LABEL_VALUES)]
+
+                    file.write(
+                        EDGE.format(
+                            index=edge_index,
+                            source=source,
+                            target=target,
+                            exit_x=0.25 if exit_y else 0.75,
+                            exit_y=exit_y,
+                            entry_x=0.25 if exit_y else 0.75,
+                            entry_y=1 - exit_y,
+                            x=column * 200 + 30,
+                            y=level * 150 + 100,
+                        ),
+                    )
+
+                    if value:
+                        file.write(
+                            LABEL.format(
+                                index=edge_index,
+                                value=quoteattr(value.format(edge_index)),
+                            ),
+                        )
+
+                    edge_index += 1
+
+        file.write(FOOTER)
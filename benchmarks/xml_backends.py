@@ -0,0 +1,89 @@
+"""Compare the XML backends of ``parse_diagram``.
+
+Every backend parses the example diagrams and a synthetic diagram, both in
+the plain and in the compressed form, in the tree and in the streaming
+mode, and must produce the same control structures::
+
+    python benchmarks/xml_backends.py --levels 50 --width 50
+"""
+
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from synthetic import write_synthetic_diagram
+
+from stpa.control_structures import ControlStructure, XMLBackend
+
+EXAMPLES = Path(__file__).parents[1] / 'stpa' / 'examples'
+
+
+def measure(
+        label: str,
+        paths: list[Path],
+        repeat: int,
+) -> None:
+    expected = [
+        ControlStructure.parse_diagram(
+            path,
+            backend=XMLBackend.ELEMENT_TREE,
+        )
+        for path in paths
+    ]
+
+    for backend in XMLBackend.get_available():
+        for streaming in False, True:
+            start = perf_counter()
+
+            for _ in range(repeat):
+                control_structures = [
+                    ControlStructure.parse_diagram(
+                        path,
+                        streaming,
+                        backend=backend,
+                    )
+                    for path in paths
+                ]
+
+            wall_time = (perf_counter() - start) / repeat
+
+            assert control_structures == expected
+
+            print(
+                f'{label:>18}'
+                f' {backend.value:>6}'
+                f' {"streaming" if streaming else "tree":>9}'
+                f' {wall_time * 1000:9.1f} ms',
+            )
+
+
+def main() -> None:
+    parser = ArgumentParser()
+
+    parser.add_argument('--levels', type=int, default=50)
+    parser.add_argument('--width', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as directory:
+        path = Path(directory) / 'synthetic.drawio.xml'
+        compressed_path = Path(directory) / 'compressed.drawio.xml'
+
+        write_synthetic_diagram(path, args.levels, args.width)
+        ControlStructure.parse_diagram(path).write_diagram(
+            compressed_path,
+            True,
+        )
+        measure(
+            'examples',
+            sorted(EXAMPLES.glob('**/*.drawio.xml')),
+            args.repeat,
+        )
+        measure('synthetic', [path], args.repeat)
+        measure('compressed', [compressed_path], args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -43,5 +43,6 @@ setup(
     },
     packages=find_packages(),
     python_requires='>=3.11',
+    extras_require={'lxml': ['lxml'], 'numpy': ['numpy']},
     package_data={'stpa': ['py.typed']},
 )
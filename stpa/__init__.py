@@ -1,17 +1,38 @@
 __all__ = (
     'CELL_TAG_NAME',
     'clean_html_text',
+    'compress_diagram',
+    'compress_diagram_chunks',
     'ControlActionOrFeedback',
+    'ControlLoop',
     'ControllerConstraint',
     'ControlStructure',
+    'ControlStructureCache',
+    'ControlStructureDelta',
     'CONTROL_STRUCTURE_PARENT',
+    'ConflictType',
     'ControlType',
+    'decode_uri_component',
+    'decompress_diagram',
+    'DEFAULT_REGISTRY',
     'Definition',
+    'Diagnostic',
+    'DiagnosticType',
     'Entity',
+    'FederatedControlStructure',
     'GEOMETRY_TAG_NAME',
     'Hazard',
     'HTML_PARSER',
+    'HTML_TEXT_CACHE_SIZE',
+    'IncrementalParser',
     'Loss',
+    'MergeConflict',
+    'ParseTimings',
+    'PARSER_VERSION',
+    'parse_style',
+    'POINTS_PATH',
+    'Reference',
+    'Registry',
     'Responsibility',
     'Scenario',
     'ScenarioType1',
@@ -22,13 +43,20 @@ __all__ = (
     'SystemLevelConstraintType2',
     'SystemLevelConstraintType3',
     'UnsafeControlAction',
+    'XML_BACKEND_VARIABLE',
+    'XMLBackend',
 )
 
 from stpa.definitions import (
     ControllerConstraint,
+    DEFAULT_REGISTRY,
     Definition,
+    Diagnostic,
+    DiagnosticType,
     Hazard,
     Loss,
+    Reference,
+    Registry,
     Responsibility,
     Scenario,
     ScenarioType1,
@@ -43,10 +71,31 @@ from stpa.definitions import (
 from stpa.control_structures import (
     CELL_TAG_NAME,
     ControlActionOrFeedback,
+    ControlLoop,
     ControlStructure,
+    ControlStructureCache,
+    ControlStructureDelta,
     CONTROL_STRUCTURE_PARENT,
+    ConflictType,
     ControlType,
     Entity,
+    FederatedControlStructure,
     GEOMETRY_TAG_NAME,
+    IncrementalParser,
+    MergeConflict,
+    ParseTimings,
+    PARSER_VERSION,
+    POINTS_PATH,
+    XML_BACKEND_VARIABLE,
+    XMLBackend,
+)
+from stpa.utilities import (
+    clean_html_text,
+    compress_diagram,
+    compress_diagram_chunks,
+    decode_uri_component,
+    decompress_diagram,
+    HTML_PARSER,
+    HTML_TEXT_CACHE_SIZE,
+    parse_style,
 )
-from stpa.utilities import clean_html_text, HTML_PARSER
@@ -1,15 +1,138 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections import defaultdict
+from collections.abc import (
+    Callable,
+    Container,
+    Hashable,
+    Iterable,
+    Iterator,
+    Mapping,
+    Sequence,
+)
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields, replace as replace_field
 from enum import auto, Enum
+from fnmatch import fnmatchcase
+from functools import cached_property, partial
+from glob import glob
+from hashlib import sha256
+from heapq import heappop, heappush
+from html import escape
+from io import (
+    BufferedReader,
+    BytesIO,
+    RawIOBase,
+    SEEK_CUR,
+    SEEK_END,
+    SEEK_SET,
+)
+from math import nan
+from multiprocessing import Pool
+from operator import attrgetter
+from os import environ, replace, utime
 from pathlib import Path
+from struct import unpack
+from sys import intern
+from tarfile import open as open_tar_file
+from tempfile import NamedTemporaryFile
+from time import perf_counter
+from typing import Any, ClassVar, IO, TypeVar
+from weakref import WeakValueDictionary
+from xml.parsers.expat import ExpatError, ParserCreate
+from xml.sax.saxutils import quoteattr
+from zipfile import is_zipfile, ZipFile
+from zlib import decompress
+import marshal
+import re
 import xml.etree.ElementTree as ET
 
-from stpa.utilities import clean_html_text
+from stpa.utilities import (
+    clean_html_text,
+    compress_diagram_chunks,
+    decode_uri_component,
+    decompress_diagram,
+    parse_style,
+)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore[assignment]
+
+try:
+    from lxml import etree as lxml_etree  # type: ignore[import-untyped]
+except ImportError:  # pragma: no cover
+    lxml_etree = None
 
 GEOMETRY_TAG_NAME = 'mxGeometry'
 CELL_TAG_NAME = 'mxCell'
+WRAPPER_TAG_NAMES = frozenset({'object', 'UserObject'})
+_CELL_TAG_NAMES = WRAPPER_TAG_NAMES | {CELL_TAG_NAME}
+POINTS_PATH = "Array[@as='points']"
 CONTROL_STRUCTURE_PARENT = '1'
+PARSER_VERSION = 3
+XML_BACKEND_VARIABLE = 'STPA_XML_BACKEND'
+_PLACEHOLDER_PATTERN = re.compile(r'%([^%\s]+)%')
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_PNG_TEXT_CHUNK_TYPES = frozenset({b'tEXt', b'zTXt'})
+_EMBEDDED_MODEL_KEYWORD = b'mxfile'
+_SVG_TAG_NAME = 'svg'
+_SVG_CONTENT_ATTRIBUTE_NAME = 'content'
+_CHUNK_SIZE = 2 ** 16
+_ENTITY_WIDTH = 160.0
+_ENTITY_HEIGHT = 60.0
+_HORIZONTAL_SPACING = 80.0
+_VERTICAL_SPACING = 100.0
+_LAYOUT_SWEEPS = 8
+_ENTITY_STYLE = 'rounded=0;whiteSpace=wrap;html=1;'
+_ACTION_STYLE = (
+    'edgeStyle=orthogonalEdgeStyle;html=1;'
+    'exitX=0.25;exitY=1;entryX=0.25;entryY=0;'
+)
+_FEEDBACK_STYLE = (
+    'edgeStyle=orthogonalEdgeStyle;html=1;'
+    'exitX=0.75;exitY=0;entryX=0.75;entryY=1;'
+)
+_EDGE_LABEL_STYLE = (
+    'edgeLabel;html=1;align=center;verticalAlign=middle;resizable=0;points=[];'
+)
+
+
+class XMLBackend(Enum):
+    ELEMENT_TREE = 'etree'
+    LXML = 'lxml'
+    EXPAT = 'expat'
+
+    @classmethod
+    def get_available(cls) -> list[XMLBackend]:
+        if lxml_etree is None:
+            return [cls.ELEMENT_TREE, cls.EXPAT]
+
+        return list(cls)
+
+    @classmethod
+    def get_default(cls) -> XMLBackend:
+        # The setting is read when parsing rather than on import, so that a
+        # bad value fails the parse instead of the import of the package.
+        value = environ.get(XML_BACKEND_VARIABLE, cls.ELEMENT_TREE.value)
+
+        try:
+            backend = cls(value)
+        except ValueError:
+            raise ValueError(
+                f'invalid {XML_BACKEND_VARIABLE} {repr(value)}, expected one'
+                f' of {repr([backend.value for backend in cls])}',
+            ) from None
+
+        if backend not in cls.get_available():
+            raise ValueError(
+                f'{XML_BACKEND_VARIABLE} is {repr(value)}, but lxml is not'
+                ' installed',
+            )
+
+        return backend
 
 
 class ControlType(Enum):
@@ -17,130 +140,2927 @@ class ControlType(Enum):
     FEEDBACK = auto()
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, init=False, slots=True, weakref_slot=True)
 class Entity:
+    __instances: ClassVar[WeakValueDictionary[str, Entity]] = (
+        WeakValueDictionary()
+    )
     name: str
 
+    def __new__(cls, name: str) -> Entity:
+        # Equal entities are one shared object with an interned name.
+        try:
+            return cls.__instances[name]
+        except KeyError:
+            pass
 
-@dataclass(frozen=True)
+        entity = object.__new__(cls)
+
+        object.__setattr__(entity, 'name', intern(name))
+
+        cls.__instances[entity.name] = entity
+
+        return entity
+
+    def __reduce__(self) -> tuple[type[Entity], tuple[str]]:
+        return type(self), (self.name,)
+
+
+@dataclass(frozen=True, slots=True)
 class ControlActionOrFeedback:
     description: str
     control_type: ControlType
     controller: Entity
     controlled: Entity
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, 'description', intern(self.description))
+
 
 @dataclass(frozen=True)
-class ControlStructure:
-    @classmethod
-    def get_control_type(
-            cls,
-            source_cell: ET.Element,
-            target_cell: ET.Element,
-    ) -> ControlType:
-        source_geometry = source_cell.find(GEOMETRY_TAG_NAME)
-        target_geometry = target_cell.find(GEOMETRY_TAG_NAME)
+class ControlLoop:
+    controller: Entity
+    controlled: Entity
+    actions: frozenset[ControlActionOrFeedback]
+    feedbacks: frozenset[ControlActionOrFeedback]
 
-        assert source_geometry is not None
-        assert target_geometry is not None
 
-        source_x = int(source_geometry.attrib['x'])
-        source_y = int(source_geometry.attrib['y'])
-        source_height = int(source_geometry.attrib['height'])
-        target_x = int(target_geometry.attrib['x'])
-        target_y = int(target_geometry.attrib['y'])
-        target_height = int(source_geometry.attrib['height'])
-        status = False
+_T = TypeVar('_T', bound=Hashable)
+
+
+def _get_arrow(
+        control_action_or_feedback: ControlActionOrFeedback,
+) -> tuple[Entity, Entity]:
+    # Information flows down action edges and up feedback edges.
+    match control_action_or_feedback.control_type:
+        case ControlType.ACTION:
+            return (
+                control_action_or_feedback.controller,
+                control_action_or_feedback.controlled,
+            )
+        case ControlType.FEEDBACK:
+            return (
+                control_action_or_feedback.controlled,
+                control_action_or_feedback.controller,
+            )
+        case control_type:
+            raise ValueError(f'unknown control type {repr(control_type)}')
+
+
+def _get_strongly_connected_components(
+        nodes: Iterable[_T],
+        successors: Mapping[_T, Iterable[_T]],
+) -> list[list[_T]]:
+    # Iterative Tarjan's algorithm. The components are returned in reverse
+    # topological order of the condensation.
+    indices: dict[_T, int] = {}
+    low_links: dict[_T, int] = {}
+    stack: list[_T] = []
+    stacked_nodes: set[_T] = set()
+    components = []
+
+    for root in nodes:
+        if root in indices:
+            continue
+
+        indices[root] = low_links[root] = len(indices)
+
+        stack.append(root)
+        stacked_nodes.add(root)
+
+        work = [(root, iter(successors.get(root, ())))]
+
+        while work:
+            node, node_successors = work[-1]
+
+            for successor in node_successors:
+                if successor not in indices:
+                    indices[successor] = low_links[successor] = len(indices)
+
+                    stack.append(successor)
+                    stacked_nodes.add(successor)
+                    work.append(
+                        (successor, iter(successors.get(successor, ()))),
+                    )
+
+                    break
+                elif successor in stacked_nodes:
+                    low_links[node] = min(low_links[node], indices[successor])
+            else:
+                work.pop()
+
+                if work:
+                    parent = work[-1][0]
+                    low_links[parent] = min(low_links[parent], low_links[node])
+
+                if low_links[node] == indices[node]:
+                    component = []
+
+                    while True:
+                        member = stack.pop()
+
+                        stacked_nodes.discard(member)
+                        component.append(member)
+
+                        if member == node:
+                            break
+
+                    components.append(component)
+
+    return components
+
+
+def _count_crossings(edges: Iterable[tuple[float, float]]) -> int:
+    # Counts the inversions of the lower endpoints once the edges are sorted
+    # by their upper endpoints, using a Fenwick tree over the lower ranks.
+    sorted_edges = sorted(edges)
+    ranks = {
+        position: rank
+        for rank, position in enumerate(
+            sorted({lower for _, lower in sorted_edges}),
+            1,
+        )
+    }
+    tree = [0] * (len(ranks) + 1)
+    crossings = 0
+
+    for count, (_, lower) in enumerate(sorted_edges):
+        rank = ranks[lower]
+        index = rank
+
+        while index > 0:
+            count -= tree[index]
+            index -= index & -index
+
+        crossings += count
+        index = rank
+
+        while index < len(tree):
+            tree[index] += 1
+            index += index & -index
+
+    return crossings
+
+
+@dataclass
+class ParseTimings:
+    decode: float = 0
+    parse: float = 0
+
+
+_Buffer = bytes | bytearray | memoryview
+_Source = str | Path | _Buffer | IO[bytes]
+
+
+class _BufferReader(RawIOBase):
+    # Serves reads from a slice of the buffer so that a diagram held in
+    # memory is never copied as a whole.
+    def __init__(self, buffer: _Buffer) -> None:
+        super().__init__()
+
+        self._view = memoryview(buffer).cast('B')
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = SEEK_SET) -> int:
+        if whence == SEEK_SET:
+            position = offset
+        elif whence == SEEK_CUR:
+            position = self._position + offset
+        elif whence == SEEK_END:
+            position = len(self._view) + offset
+        else:
+            raise ValueError(f'invalid whence {repr(whence)}')
+
+        if position < 0:
+            raise ValueError(f'negative seek position {repr(position)}')
+
+        self._position = position
+
+        return position
+
+    def readinto(self, buffer: Any) -> int:
+        data = self._view[self._position:self._position + len(buffer)]
+        size = len(data)
+        buffer[:size] = data
+        self._position += size
+
+        return size
+
+
+@contextmanager
+def _open_source(source: _Source) -> Iterator[IO[bytes]]:
+    if isinstance(source, (str, Path)):
+        with open(source, 'rb') as file:
+            yield file
+    elif isinstance(source, bytes):
+        yield BytesIO(source)
+    elif isinstance(source, (bytearray, memoryview)):
+        yield BufferedReader(_BufferReader(source))
+    else:
+        yield source
+
+
+class _PrefixedReader(RawIOBase):
+    # Replays the bytes already consumed from a non-seekable file before
+    # reading the rest of it.
+    def __init__(self, prefix: bytes, file: IO[bytes]) -> None:
+        super().__init__()
+
+        self._prefix = memoryview(prefix)
+        self._file = file
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        if self._prefix:
+            data = self._prefix[:len(buffer)]
+            self._prefix = self._prefix[len(data):]
+        else:
+            data = memoryview(self._file.read(len(buffer)))
+
+        buffer[:len(data)] = data
+
+        return len(data)
+
+
+def _read_png_model(file: IO[bytes]) -> bytes:
+    # Walks the chunks following the signature, skipping the pixel data,
+    # until the text chunk holding the diagram.
+    while len(header := file.read(8)) == 8:
+        length, chunk_type = unpack('>I4s', header)
+
+        if chunk_type == b'IEND':
+            break
+
+        if chunk_type in _PNG_TEXT_CHUNK_TYPES:
+            keyword, _, text = file.read(length).partition(b'\0')
+
+            if keyword == _EMBEDDED_MODEL_KEYWORD:
+                if chunk_type == b'zTXt':
+                    text = decompress(text[1:])
+
+                if not text.startswith(b'<'):
+                    text = decode_uri_component(text)
+
+                return text
+
+            length = 0
+
+        remaining = length + 4
+
+        while remaining and (data := file.read(min(remaining, _CHUNK_SIZE))):
+            remaining -= len(data)
+
+    raise ValueError('no diagram embedded in the PNG file')
+
+
+def _get_model_file(file: IO[bytes]) -> IO[bytes]:
+    # Pulls the model out of draw.io PNG and SVG exports. Any other file is
+    # handed back from its start once the root element has been seen.
+    position = file.tell() if file.seekable() else None
+    prefix = file.read(len(_PNG_SIGNATURE))
+
+    if prefix == _PNG_SIGNATURE:
+        return BytesIO(_read_png_model(file))
+
+    chunks = [prefix]
+    chunk_size = _CHUNK_SIZE
+    roots: list[tuple[str, dict[str, str]]] = []
+    parser = ParserCreate()
+
+    def handle_start(tag: str, attrib: dict[str, str]) -> None:
+        if not roots:
+            roots.append((tag, attrib))
+
+    parser.StartElementHandler = handle_start
+
+    try:
+        parser.Parse(prefix)
+
+        # expat rescans an unfinished start tag whenever data is fed, so the
+        # chunks grow geometrically to keep a huge ``content`` attribute
+        # linear.
+        while not roots and (chunk := file.read(chunk_size)):
+            chunks.append(chunk)
+            parser.Parse(chunk)
+
+            chunk_size *= 2
+    except ExpatError:
+        pass
+
+    if roots and roots[0][0] == _SVG_TAG_NAME:
+        _, attrib = roots[0]
+
+        if _SVG_CONTENT_ATTRIBUTE_NAME not in attrib:
+            raise ValueError('no diagram embedded in the SVG file')
+
+        return BytesIO(attrib[_SVG_CONTENT_ATTRIBUTE_NAME].encode())
+
+    if position is not None:
+        file.seek(position)
+
+        return file
+
+    return BufferedReader(_PrefixedReader(b''.join(chunks), file))
+
+
+@contextmanager
+def _open_model(source: _Source) -> Iterator[IO[bytes]]:
+    with _open_source(source) as file:
+        yield _get_model_file(file)
+
+
+_Geometry = tuple[float, float, float, float]
+_Route = tuple[float, float, float, float, float, float, float, float]
+_Point = tuple[float, float]
+_NO_ROUTE: _Route = (nan, nan, nan, nan, nan, nan, nan, nan)
+
+
+def _get_geometry(geometry: Mapping[str, str]) -> _Geometry:
+    return (
+        float(geometry.get('x', 0)),
+        float(geometry.get('y', 0)),
+        float(geometry.get('width', 0)),
+        float(geometry.get('height', 0)),
+    )
+
+
+def _get_route(style: Mapping[str, str], points: Sequence[_Point]) -> _Route:
+    first_x, first_y = points[0] if points else (nan, nan)
+    last_x, last_y = points[-1] if points else (nan, nan)
+
+    return (
+        float(style.get('exitX', nan)),
+        float(style.get('exitY', nan)),
+        float(style.get('entryX', nan)),
+        float(style.get('entryY', nan)),
+        first_x,
+        first_y,
+        last_x,
+        last_y,
+    )
+
+
+def _get_points(geometry: ET.Element) -> list[_Point]:
+    points = []
+
+    for array in geometry.iterfind(POINTS_PATH):
+        for point in array:
+            points.append((float(point.get('x', 0)), float(point.get('y', 0))))
+
+    return points
+
+
+def _unwrap_attrib(
+        wrapper_attrib: Mapping[str, str],
+        cell_attrib: Mapping[str, str],
+) -> dict[str, str]:
+    # The id and the label of a wrapped cell live on its ``object`` or
+    # ``UserObject`` wrapper, next to the custom properties the label may
+    # refer to as placeholders.
+    attrib = dict(cell_attrib)
+    label = wrapper_attrib.get('label', '')
+
+    if wrapper_attrib.get('placeholders') == '1':
+        label = _PLACEHOLDER_PATTERN.sub(
+            lambda match: wrapper_attrib.get(match[1], match[0]),
+            label,
+        )
+
+    attrib['id'] = wrapper_attrib['id']
+    attrib['value'] = label
+
+    return attrib
+
+
+def _unwrap_cell(
+        cell: ET.Element,
+) -> tuple[Mapping[str, str], ET.Element | None] | None:
+    if cell.tag == CELL_TAG_NAME:
+        return cell.attrib, cell.find(GEOMETRY_TAG_NAME)
+
+    if cell.tag in WRAPPER_TAG_NAMES:
+        wrapped_cell = cell.find(CELL_TAG_NAME)
+
+        if wrapped_cell is not None:
+            return (
+                _unwrap_attrib(cell.attrib, wrapped_cell.attrib),
+                wrapped_cell.find(GEOMETRY_TAG_NAME),
+            )
+
+    return None
+
+
+@dataclass
+class _CellTable:
+    entities: dict[str, Entity] = field(default_factory=dict)
+    geometries: dict[str, _Geometry] = field(default_factory=dict)
+    labels: dict[str, str] = field(default_factory=dict)
+    edges: dict[str, tuple[str, str]] = field(default_factory=dict)
+    routes: dict[str, _Route] = field(default_factory=dict)
+    parents: dict[str, str] = field(default_factory=dict)
+    origins: dict[str, _Point] = field(default_factory=dict)
+
+    def add(
+            self,
+            attrib: Mapping[str, str],
+            geometry: Mapping[str, str] | None,
+            points: Sequence[_Point] = (),
+    ) -> None:
+        id_ = attrib['id']
+        cleaned_value = ''
+        parent = attrib.get('parent', '')
+
+        is_vertex = attrib.get('vertex') == '1'
+
+        if 'value' in attrib:
+            cleaned_value = clean_html_text(attrib['value'])
+
+        # draw.io positions a nested cell relative to its container, so the
+        # origin of the container on the page is added to its geometry.
+        origin_x, origin_y = self.origins.get(parent, (0, 0))
+        page_geometry = None
+
+        if geometry is not None:
+            x, y, width, height = _get_geometry(geometry)
+            page_geometry = origin_x + x, origin_y + y, width, height
+
+        if is_vertex:
+            self.parents[id_] = parent
+
+            if page_geometry is not None and (
+                    parent == CONTROL_STRUCTURE_PARENT
+                    or parent in self.parents
+            ):
+                self.origins[id_] = page_geometry[:2]
+
+        if cleaned_value:
+            # draw.io writes containers before their children, so a vertex
+            # nested in a group or swimlane finds its parent already indexed
+            # while the labels of edges do not.
+            if parent == CONTROL_STRUCTURE_PARENT or (
+                    is_vertex and parent in self.parents
+            ):
+                self.entities[id_] = Entity(cleaned_value)
+
+                if page_geometry is not None:
+                    self.geometries[id_] = page_geometry
+            else:
+                self.labels[parent] = cleaned_value
 
         if (
-                source_y <= target_y <= source_y + source_height
-                or target_y <= source_y <= target_y + target_height
+                attrib.get('edge') == '1'
+                and 'source' in attrib
+                and 'target' in attrib
         ):
-            status = source_x < target_x
-        else:
-            status = source_y < target_y
+            self.edges[id_] = attrib['source'], attrib['target']
+            style = parse_style(attrib.get('style', ''))
+            points = [(origin_x + x, origin_y + y) for x, y in points]
+            self.routes[id_] = _get_route(style, points)
 
-        return ControlType.ACTION if status else ControlType.FEEDBACK
+    def add_element(self, cell: ET.Element) -> None:
+        unwrapped_cell = _unwrap_cell(cell)
 
-    @classmethod
-    def parse_diagram(cls, source: str | Path) -> ControlStructure:
-        tree = ET.parse(source)
-        root = tree.getroot()[0][0][0]
-        cells = {}
-        cleaned_values = {}
+        if unwrapped_cell is None:
+            return
+
+        attrib, geometry = unwrapped_cell
+
+        if geometry is None:
+            self.add(attrib, None)
+        elif attrib.get('edge') == '1':
+            self.add(attrib, geometry.attrib, _get_points(geometry))
+        else:
+            self.add(attrib, geometry.attrib)
+
+    def get_containments(self) -> frozenset[tuple[Entity, Entity]]:
+        # Maps every indexed cell to the nearest entity at or above it,
+        # resolving each container once.
+        nearest_ids: dict[str, str | None] = {}
 
-        for cell in root.findall(CELL_TAG_NAME):
-            id_ = cell.attrib['id']
-            cells[id_] = cell
+        def get_nearest_id(id_: str) -> str | None:
+            path = []
 
-            if 'value' in cell.attrib:
-                value = cell.attrib['value']
-                cleaned_value = clean_html_text(value)
-                cleaned_values[id_] = cleaned_value
+            while id_ not in nearest_ids:
+                if id_ in self.entities:
+                    nearest_ids[id_] = id_
+                elif id_ in self.parents:
+                    nearest_ids[id_] = None
 
-        entities = {}
-        parent_cleaned_values = {}
+                    path.append(id_)
 
-        for cell in cells.values():
-            id_ = cell.attrib['id']
-            cleaned_value = cleaned_values.get(id_, '')
-            parent = cell.attrib.get('parent', '')
+                    id_ = self.parents[id_]
 
-            if cleaned_value:
-                if parent == CONTROL_STRUCTURE_PARENT:
-                    entities[id_] = Entity(cleaned_value)
+                    continue
                 else:
-                    parent_cleaned_values[parent] = cleaned_value
+                    nearest_ids[id_] = None
 
-        control_actions_or_feedbacks = []
+                break
+
+            nearest_id = nearest_ids[id_]
+
+            for path_id in path:
+                nearest_ids[path_id] = nearest_id
+
+            return nearest_id
+
+        containments = set()
+
+        for id_, entity in self.entities.items():
+            if id_ in self.parents:
+                container_id = get_nearest_id(self.parents[id_])
+
+                if container_id is not None:
+                    container = self.entities[container_id]
+
+                    if container != entity:
+                        containments.add((entity, container))
+
+        return frozenset(containments)
+
+    def get_control_types(self, ids: Iterable[str]) -> dict[str, ControlType]:
+        control_types = {}
+        unlabelled_ids = []
+        indices: dict[str, int] = {}
+        sources = []
+        targets = []
+        routes = []
+
+        for id_ in ids:
+            cleaned_value = self.labels.get(id_, '').lower()
+
+            if cleaned_value.startswith('action'):
+                control_types[id_] = ControlType.ACTION
+            elif cleaned_value.startswith('feedback'):
+                control_types[id_] = ControlType.FEEDBACK
+            else:
+                source, target = self.edges[id_]
+
+                for endpoint in source, target:
+                    if endpoint not in indices:
+                        indices[endpoint] = len(indices)
+
+                unlabelled_ids.append(id_)
+                sources.append(indices[source])
+                targets.append(indices[target])
+                routes.append(self.routes[id_])
+
+        geometries = [self.geometries[endpoint] for endpoint in indices]
+        unlabelled_control_types = ControlStructure._get_control_types(
+            geometries,
+            sources,
+            targets,
+            routes,
+        )
+
+        control_types.update(zip(unlabelled_ids, unlabelled_control_types))
+
+        return control_types
+
+    def resolve(
+            self,
+            id_: str,
+            control_type: ControlType,
+    ) -> ControlActionOrFeedback:
+        source, target = self.edges[id_]
+        source_entity = self.entities[source]
+        target_entity = self.entities[target]
+
+        match control_type:
+            case ControlType.ACTION:
+                controller, controlled = source_entity, target_entity
+            case ControlType.FEEDBACK:
+                controller, controlled = target_entity, source_entity
+            case _:
+                raise ValueError(f'unknown control type {repr(control_type)}')
+
+        return ControlActionOrFeedback(
+            self.labels.get(id_, ''),
+            control_type,
+            controller,
+            controlled,
+        )
+
+    def build(self) -> ControlStructure:
+        control_types = self.get_control_types(self.edges)
+        control_actions_or_feedbacks = map(
+            self.resolve,
+            control_types,
+            control_types.values(),
+        )
+
+        return ControlStructure(
+            frozenset(self.entities.values()),
+            frozenset(control_actions_or_feedbacks),
+            self.get_containments(),
+        )
+
+
+@dataclass
+class _ExpatCellReader:
+    # Feeds the cells of a diagram to a cell table straight from the expat
+    # callbacks, following the same first-child path as
+    # ``ControlStructure._iterparse_cells`` without allocating elements.
+    cell_table: _CellTable
+    depth: int
+    timings: ParseTimings | None
+    leadings: list[bool] = field(default_factory=lambda: [True])
+    counts: list[int] = field(default_factory=lambda: [0])
+    texts: list[str] = field(default_factory=list)
+    wrapper_attrib: dict[str, str] | None = None
+    attrib: dict[str, str] | None = None
+    cell_level: int = 0
+    geometry: dict[str, str] | None = None
+    points: list[_Point] = field(default_factory=list)
+    geometry_open: bool = False
+    points_open: bool = False
+    done: bool = False
+
+    def read(self, file: IO[bytes]) -> None:
+        parser = ParserCreate()
+        parser.buffer_text = True
+        parser.StartElementHandler = self.start
+        parser.EndElementHandler = self.end
+        parser.CharacterDataHandler = self.handle_data
 
-        for cell in cells.values():
+        try:
+            parser.ParseFile(file)
+        except ExpatError as error:
+            parse_error = ET.ParseError(str(error))
+            parse_error.code = error.code
+            parse_error.position = error.lineno, error.offset
+
+            raise parse_error from error
+
+    def start(self, tag: str, attrib: dict[str, str]) -> None:
+        if self.done:
+            return
+
+        self.leadings.append(self.leadings[-1] and not self.counts[-1])
+        self.counts[-1] += 1
+        self.counts.append(0)
+
+        level = len(self.leadings) - 1
+
+        if self.attrib is None:
+            if level == self.depth and self.leadings[-2]:
+                if tag == CELL_TAG_NAME:
+                    self.start_cell(level, attrib)
+                elif tag in WRAPPER_TAG_NAMES:
+                    self.wrapper_attrib = attrib
+            elif (
+                    level == self.depth + 1
+                    and self.wrapper_attrib is not None
+                    and tag == CELL_TAG_NAME
+            ):
+                self.start_cell(
+                    level,
+                    _unwrap_attrib(self.wrapper_attrib, attrib),
+                )
+
+                self.wrapper_attrib = None
+        elif level == self.cell_level + 1:
+            if tag == GEOMETRY_TAG_NAME and self.geometry is None:
+                self.geometry = attrib
+                self.geometry_open = True
+        elif level == self.cell_level + 2:
             if (
-                    cell.attrib.get('edge') == '1'
-                    and 'source' in cell.attrib
-                    and 'target' in cell.attrib
+                    self.geometry_open
+                    and tag == 'Array'
+                    and attrib.get('as') == 'points'
             ):
-                id_ = cell.attrib['id']
-                cleaned_value = parent_cleaned_values.get(id_, '')
-                source_cell = cells[cell.attrib['source']]
-                target_cell = cells[cell.attrib['target']]
+                self.points_open = True
+        elif level == self.cell_level + 3:
+            if self.points_open and self.attrib.get('edge') == '1':
+                self.points.append(
+                    (float(attrib.get('x', 0)), float(attrib.get('y', 0))),
+                )
 
-                if cleaned_value.lower().startswith('action'):
-                    control_type = ControlType.ACTION
-                elif cleaned_value.lower().startswith('feedback'):
-                    control_type = ControlType.FEEDBACK
-                else:
-                    control_type = cls.get_control_type(
-                        source_cell,
-                        target_cell,
-                    )
+    def start_cell(self, level: int, attrib: dict[str, str]) -> None:
+        self.attrib = attrib
+        self.cell_level = level
+        self.geometry = None
+        self.points = []
 
-                source_entity = entities[cell.attrib['source']]
-                target_entity = entities[cell.attrib['target']]
-
-                match control_type:
-                    case ControlType.ACTION:
-                        controller, controlled = source_entity, target_entity
-                    case ControlType.FEEDBACK:
-                        controller, controlled = target_entity, source_entity
-                    case _:
-                        raise ValueError(
-                            f'unknown control type {repr(control_type)}',
-                        )
+    def end(self, tag: str) -> None:
+        if self.done:
+            return
+
+        level = len(self.leadings) - 1
+
+        if self.attrib is not None:
+            if level == self.cell_level:
+                self.cell_table.add(self.attrib, self.geometry, self.points)
 
-                control_action_or_feedback = ControlActionOrFeedback(
-                    cleaned_value,
-                    control_type,
-                    controller,
-                    controlled,
+                self.attrib = None
+            elif level == self.cell_level + 1:
+                self.geometry_open = False
+            elif level == self.cell_level + 2:
+                self.points_open = False
+        elif level == self.depth - 3 and self.leadings[-1]:
+            if not self.counts[-1]:
+                model = ControlStructure._decompress_diagram(
+                    ''.join(self.texts),
+                    self.timings,
                 )
 
-                control_actions_or_feedbacks.append(control_action_or_feedback)
+                _ExpatCellReader(self.cell_table, 3, self.timings).read(
+                    BytesIO(model),
+                )
 
-        return cls(
-            frozenset(entities.values()),
-            frozenset(control_actions_or_feedbacks),
+            self.done = True
+
+        if level == self.depth:
+            self.wrapper_attrib = None
+
+        self.leadings.pop()
+        self.counts.pop()
+
+    def handle_data(self, data: str) -> None:
+        if (
+                len(self.leadings) - 1 == self.depth - 3
+                and self.leadings[-1]
+                and not self.counts[-1]
+        ):
+            self.texts.append(data)
+
+
+@dataclass(frozen=True)
+class ControlStructure:
+    @classmethod
+    def _get_control_type(
+            cls,
+            source_geometry: _Geometry,
+            target_geometry: _Geometry,
+            route: _Route = _NO_ROUTE,
+    ) -> ControlType:
+        # Comparisons with the NaN of a missing hint or waypoint are false
+        # and thus never vote.
+        source_x, source_y, source_width, source_height = source_geometry
+        target_x, target_y, target_width, target_height = target_geometry
+        exit_x, exit_y, entry_x, entry_y, first_x, first_y, last_x, last_y = (
+            route
+        )
+        vertical_votes = (
+            (exit_y == 1) - (exit_y == 0)
+            + (entry_y == 0) - (entry_y == 1)
+            + (first_y >= source_y + source_height) - (first_y <= source_y)
+            + (last_y <= target_y) - (last_y >= target_y + target_height)
+        )
+        status = False
+
+        if vertical_votes:
+            status = vertical_votes > 0
+        elif (
+                source_y <= target_y <= source_y + source_height
+                or target_y <= source_y <= target_y + target_height
+        ):
+            horizontal_votes = (
+                (exit_x == 1) - (exit_x == 0)
+                + (entry_x == 0) - (entry_x == 1)
+                + (first_x >= source_x + source_width) - (first_x <= source_x)
+                + (last_x <= target_x) - (last_x >= target_x + target_width)
+            )
+
+            if horizontal_votes:
+                status = horizontal_votes > 0
+            else:
+                status = source_x < target_x
+        else:
+            status = source_y < target_y
+
+        return ControlType.ACTION if status else ControlType.FEEDBACK
+
+    @classmethod
+    def _get_control_types(
+            cls,
+            geometries: Sequence[_Geometry],
+            sources: Sequence[int],
+            targets: Sequence[int],
+            routes: Sequence[_Route],
+    ) -> list[ControlType]:
+        if np is None:
+            return [
+                cls._get_control_type(
+                    geometries[source],
+                    geometries[target],
+                    route,
+                )
+                for source, target, route in zip(sources, targets, routes)
+            ]
+
+        geometry_array = np.array(geometries, float).reshape(-1, 4)
+        source_x, source_y, source_width, source_height = (
+            geometry_array[np.array(sources, int)].T
+        )
+        target_x, target_y, target_width, target_height = (
+            geometry_array[np.array(targets, int)].T
+        )
+        exit_x, exit_y, entry_x, entry_y, first_x, first_y, last_x, last_y = (
+            np.array(routes, float).reshape(-1, 8).T
         )
 
-    entities: frozenset[Entity]
-    control_actions_or_feedbacks: frozenset[ControlActionOrFeedback]
+        def vote(positive: Any, negative: Any) -> Any:
+            return positive.astype(np.int8) - negative.astype(np.int8)
+
+        vertical_votes = (
+            vote(exit_y == 1, exit_y == 0)
+            + vote(entry_y == 0, entry_y == 1)
+            + vote(first_y >= source_y + source_height, first_y <= source_y)
+            + vote(last_y <= target_y, last_y >= target_y + target_height)
+        )
+        horizontal_votes = (
+            vote(exit_x == 1, exit_x == 0)
+            + vote(entry_x == 0, entry_x == 1)
+            + vote(first_x >= source_x + source_width, first_x <= source_x)
+            + vote(last_x <= target_x, last_x >= target_x + target_width)
+        )
+        overlaps = (
+            (source_y <= target_y) & (target_y <= source_y + source_height)
+            | (target_y <= source_y) & (source_y <= target_y + target_height)
+        )
+        statuses = np.where(
+            vertical_votes != 0,
+            vertical_votes > 0,
+            np.where(
+                overlaps,
+                np.where(
+                    horizontal_votes != 0,
+                    horizontal_votes > 0,
+                    source_x < target_x,
+                ),
+                source_y < target_y,
+            ),
+        )
+
+        return [
+            ControlType.ACTION if status else ControlType.FEEDBACK
+            for status in statuses.tolist()
+        ]
+
+    @classmethod
+    def get_control_type(
+            cls,
+            source_cell: ET.Element,
+            target_cell: ET.Element,
+            edge_cell: ET.Element | None = None,
+    ) -> ControlType:
+        source_geometry = source_cell.find(GEOMETRY_TAG_NAME)
+        target_geometry = target_cell.find(GEOMETRY_TAG_NAME)
+
+        assert source_geometry is not None
+        assert target_geometry is not None
+
+        route = _NO_ROUTE
+
+        if edge_cell is not None:
+            edge_geometry = edge_cell.find(GEOMETRY_TAG_NAME)
+            points = []
+
+            if edge_geometry is not None:
+                points = _get_points(edge_geometry)
+
+            route = _get_route(
+                parse_style(edge_cell.get('style', '')),
+                points,
+            )
+
+        return cls._get_control_type(
+            _get_geometry(source_geometry.attrib),
+            _get_geometry(target_geometry.attrib),
+            route,
+        )
+
+    @classmethod
+    def _decompress_diagram(
+            cls,
+            text: str,
+            timings: ParseTimings | None,
+    ) -> bytes:
+        start_time = perf_counter()
+        model = decompress_diagram(text)
+
+        if timings is not None:
+            timings.decode += perf_counter() - start_time
+
+        return model
+
+    @classmethod
+    def _get_graph_model(
+            cls,
+            diagram: ET.Element,
+            timings: ParseTimings | None,
+            fromstring: Callable[[bytes], ET.Element] = ET.fromstring,
+    ) -> ET.Element:
+        if len(diagram):
+            return diagram[0]
+
+        model = cls._decompress_diagram(diagram.text or '', timings)
+
+        return fromstring(model)
+
+    @classmethod
+    def _parse_graph_model(cls, model: ET.Element) -> ControlStructure:
+        cell_table = _CellTable()
+
+        for cell in model[0]:
+            cell_table.add_element(cell)
+
+        return cell_table.build()
+
+    @classmethod
+    def _parse_page(cls, page: str | bytes) -> ControlStructure:
+        if isinstance(page, str):
+            page = decompress_diagram(page)
+
+        return cls._parse_graph_model(ET.fromstring(page))
+
+    @classmethod
+    def _iterparse_cells(
+            cls,
+            file: IO[bytes],
+            depth: int,
+            timings: ParseTimings | None,
+            iterparse: Callable[..., Iterator[tuple[str, Any]]] = (
+                ET.iterparse
+            ),
+    ) -> Iterator[ET.Element]:
+        # Only the first child is followed at every level above the cells,
+        # which sit at ``depth`` (5 in an ``mxfile``, 3 in a decompressed
+        # ``mxGraphModel``), mirroring ``getroot()[0][0][0]``. Yielded cells
+        # are cleared once the consumer resumes the iteration.
+        leadings = [True]
+        counts = [0]
+        root = None
+
+        for event, element in iterparse(file, ('start', 'end')):
+            if event == 'start':
+                leadings.append(leadings[-1] and not counts[-1])
+                counts[-1] += 1
+                counts.append(0)
+
+                if len(leadings) == depth and leadings[-1]:
+                    root = element
+
+                continue
+
+            if len(leadings) == depth + 1 and leadings[-2]:
+                assert root is not None
+
+                if element.tag in _CELL_TAG_NAMES:
+                    yield element
+
+                root.clear()
+            elif len(leadings) == depth - 2 and leadings[-1]:
+                if not counts[-1]:
+                    model = cls._decompress_diagram(
+                        element.text or '',
+                        timings,
+                    )
+
+                    yield from cls._iterparse_cells(
+                        BytesIO(model),
+                        3,
+                        timings,
+                        iterparse,
+                    )
+
+                break
+
+            leadings.pop()
+            counts.pop()
+
+    @classmethod
+    def _parse_cells(
+            cls,
+            file: IO[bytes],
+            streaming: bool,
+            timings: ParseTimings | None,
+            backend: XMLBackend,
+    ) -> ControlStructure:
+        parse: Callable[[IO[bytes]], Any] = ET.parse
+        fromstring: Callable[[bytes], ET.Element] = ET.fromstring
+        iterparse: Callable[..., Iterator[tuple[str, Any]]] = ET.iterparse
+        cell_table = _CellTable()
+
+        if backend == XMLBackend.LXML:
+            if lxml_etree is None:
+                raise ValueError('lxml is not installed')
+
+            options = {
+                'remove_comments': True,
+                'remove_pis': True,
+                'huge_tree': True,
+            }
+            parse = partial(
+                lxml_etree.parse,
+                parser=lxml_etree.XMLParser(**options),
+            )
+            fromstring = partial(
+                lxml_etree.fromstring,
+                parser=lxml_etree.XMLParser(**options),
+            )
+            iterparse = partial(lxml_etree.iterparse, **options)
+
+        if backend == XMLBackend.EXPAT:
+            _ExpatCellReader(cell_table, 5, timings).read(file)
+        elif streaming:
+            for cell in cls._iterparse_cells(file, 5, timings, iterparse):
+                cell_table.add_element(cell)
+        else:
+            tree = parse(file)
+            model = cls._get_graph_model(
+                tree.getroot()[0],
+                timings,
+                fromstring,
+            )
+
+            return cls._parse_graph_model(model)
+
+        return cell_table.build()
+
+    @classmethod
+    def _parse_file(
+            cls,
+            file: IO[bytes],
+            streaming: bool,
+            timings: ParseTimings | None,
+            backend: XMLBackend | None = None,
+    ) -> ControlStructure:
+        start_time = perf_counter()
+        decode_time = 0 if timings is None else timings.decode
+
+        if backend is None:
+            backend = XMLBackend.get_default()
+
+        try:
+            control_structure = cls._parse_cells(
+                file,
+                streaming,
+                timings,
+                backend,
+            )
+        except SyntaxError as error:
+            # The syntax errors of lxml are normalized to those of
+            # ElementTree like the ones of expat.
+            if isinstance(error, ET.ParseError):
+                raise
+
+            parse_error = ET.ParseError(error.msg)
+            parse_error.code = getattr(error, 'code', 0)
+            parse_error.position = error.lineno or 0, error.offset or 0
+
+            raise parse_error from error
+
+        if timings is not None:
+            decode_time = timings.decode - decode_time
+            timings.parse += perf_counter() - start_time - decode_time
+
+        return control_structure
+
+    @classmethod
+    def parse_diagram(
+            cls,
+            source: _Source,
+            streaming: bool = False,
+            timings: ParseTimings | None = None,
+            cache: ControlStructureCache | None = None,
+            backend: XMLBackend | None = None,
+    ) -> ControlStructure:
+        if cache is None or cache.bypass:
+            with _open_model(source) as file:
+                return cls._parse_file(file, streaming, timings, backend)
+
+        content: _Buffer
+
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            content = source
+        else:
+            with _open_source(source) as file:
+                content = file.read()
+
+        key = cache.get_key(content)
+        control_structure = cache.load(key)
+
+        if control_structure is None:
+            with _open_model(content) as file:
+                control_structure = cls._parse_file(
+                    file,
+                    streaming,
+                    timings,
+                    backend,
+                )
+
+            cache.store(key, control_structure)
+
+        return control_structure
+
+    @classmethod
+    def parse_pages(
+            cls,
+            source: _Source,
+            max_workers: int | None = 1,
+    ) -> dict[str, ControlStructure]:
+        with _open_model(source) as file:
+            tree = ET.parse(file)
+
+        pages: dict[str, str | bytes] = {}
+
+        for index, diagram in enumerate(tree.getroot()):
+            name = diagram.get('name', f'Page-{index + 1}')
+
+            if name in pages:
+                raise ValueError(f'duplicate page name {repr(name)}')
+
+            if len(diagram):
+                pages[name] = ET.tostring(diagram[0])
+            else:
+                pages[name] = diagram.text or ''
+
+        control_structures: Iterable[ControlStructure]
+
+        if max_workers == 1:
+            control_structures = map(cls._parse_page, pages.values())
+        else:
+            with ProcessPoolExecutor(max_workers) as executor:
+                control_structures = list(
+                    executor.map(cls._parse_page, pages.values()),
+                )
+
+        return dict(zip(pages, control_structures))
+
+    @classmethod
+    def _try_parse_diagram(
+            cls,
+            cache: ControlStructureCache | None,
+            backend: XMLBackend | None,
+            path: Path,
+    ) -> tuple[Path, ControlStructure | Exception]:
+        try:
+            return path, cls.parse_diagram(
+                path,
+                cache=cache,
+                backend=backend,
+            )
+        except Exception as error:
+            return path, error
+
+    @classmethod
+    def parse_diagrams(
+            cls,
+            source: str | Path,
+            pattern: str = '**/*.drawio.xml',
+            max_workers: int | None = None,
+            chunk_size: int = 1,
+            cache: ControlStructureCache | None = None,
+            backend: XMLBackend | None = None,
+    ) -> Iterator[tuple[Path, ControlStructure | Exception]]:
+        worker_cache = cache
+        paths: list[Path]
+
+        if cache is not None and not cache.bypass:
+            # The workers leave the eviction to a single sweep of the cache
+            # after the batch.
+            worker_cache = replace_field(cache, defer_eviction=True)
+
+        try_parse_diagram = partial(
+            cls._try_parse_diagram,
+            worker_cache,
+            backend,
+        )
+
+        if Path(source).is_dir():
+            paths = sorted(Path(source).glob(pattern))
+        else:
+            paths = list(map(Path, sorted(glob(str(source), recursive=True))))
+
+        try:
+            if max_workers == 1:
+                yield from map(try_parse_diagram, paths)
+            else:
+                with Pool(max_workers) as pool:
+                    yield from pool.imap_unordered(
+                        try_parse_diagram,
+                        paths,
+                        chunk_size,
+                    )
+        finally:
+            if cache is not None and not cache.bypass:
+                cache.evict()
+
+    @classmethod
+    def _iter_archive_members(
+            cls,
+            file: IO[bytes],
+            pattern: str,
+    ) -> Iterator[tuple[str, IO[bytes]]]:
+        if is_zipfile(file):
+            with ZipFile(file) as zip_file:
+                for zip_info in zip_file.infolist():
+                    if (
+                            not zip_info.is_dir()
+                            and fnmatchcase(zip_info.filename, pattern)
+                    ):
+                        with zip_file.open(zip_info) as member:
+                            yield zip_info.filename, member
+        else:
+            file.seek(0)
+
+            with open_tar_file(fileobj=file) as tar_file:
+                for tar_info in tar_file:
+                    if (
+                            tar_info.isfile()
+                            and fnmatchcase(tar_info.name, pattern)
+                    ):
+                        tar_member = tar_file.extractfile(tar_info)
+
+                        assert tar_member is not None
+
+                        with tar_member:
+                            yield tar_info.name, tar_member
+
+    @classmethod
+    def parse_archive(
+            cls,
+            source: _Source,
+            pattern: str = '*.drawio.xml',
+            streaming: bool = False,
+            cache: ControlStructureCache | None = None,
+            backend: XMLBackend | None = None,
+    ) -> Iterator[tuple[str, ControlStructure | Exception]]:
+        result: ControlStructure | Exception
+
+        with _open_source(source) as file:
+            for name, member in cls._iter_archive_members(file, pattern):
+                try:
+                    result = cls.parse_diagram(
+                        member,
+                        streaming,
+                        cache=cache,
+                        backend=backend,
+                    )
+                except Exception as error:
+                    result = error
+
+                yield name, result
+
+    @cached_property
+    def _controller_index(
+            self,
+    ) -> dict[tuple[ControlType, Entity], frozenset[ControlActionOrFeedback]]:
+        index = defaultdict(list)
+
+        for control_action_or_feedback in self.control_actions_or_feedbacks:
+            key = (
+                control_action_or_feedback.control_type,
+                control_action_or_feedback.controller,
+            )
+
+            index[key].append(control_action_or_feedback)
+
+        return {key: frozenset(value) for key, value in index.items()}
+
+    @cached_property
+    def _controlled_index(
+            self,
+    ) -> dict[tuple[ControlType, Entity], frozenset[ControlActionOrFeedback]]:
+        index = defaultdict(list)
+
+        for control_action_or_feedback in self.control_actions_or_feedbacks:
+            key = (
+                control_action_or_feedback.control_type,
+                control_action_or_feedback.controlled,
+            )
+
+            index[key].append(control_action_or_feedback)
+
+        return {key: frozenset(value) for key, value in index.items()}
+
+    @cached_property
+    def _description_index(
+            self,
+    ) -> dict[str, frozenset[ControlActionOrFeedback]]:
+        index = defaultdict(list)
+
+        for control_action_or_feedback in self.control_actions_or_feedbacks:
+            key = control_action_or_feedback.description
+
+            index[key].append(control_action_or_feedback)
+
+        return {key: frozenset(value) for key, value in index.items()}
+
+    def get_actions_by_controller(
+            self,
+            controller: Entity,
+    ) -> frozenset[ControlActionOrFeedback]:
+        key = ControlType.ACTION, controller
+
+        return self._controller_index.get(key, frozenset())
+
+    def get_actions_by_controlled(
+            self,
+            controlled: Entity,
+    ) -> frozenset[ControlActionOrFeedback]:
+        key = ControlType.ACTION, controlled
+
+        return self._controlled_index.get(key, frozenset())
+
+    def get_feedbacks_by_controller(
+            self,
+            controller: Entity,
+    ) -> frozenset[ControlActionOrFeedback]:
+        key = ControlType.FEEDBACK, controller
+
+        return self._controller_index.get(key, frozenset())
+
+    def get_feedbacks_by_controlled(
+            self,
+            controlled: Entity,
+    ) -> frozenset[ControlActionOrFeedback]:
+        key = ControlType.FEEDBACK, controlled
+
+        return self._controlled_index.get(key, frozenset())
+
+    def get_by_description(
+            self,
+            description: str,
+    ) -> frozenset[ControlActionOrFeedback]:
+        return self._description_index.get(description, frozenset())
+
+    @cached_property
+    def _container_index(self) -> dict[Entity, frozenset[Entity]]:
+        index = defaultdict(list)
+
+        for entity, container in self.containments:
+            index[entity].append(container)
+
+        return {key: frozenset(value) for key, value in index.items()}
+
+    @cached_property
+    def _contained_index(self) -> dict[Entity, frozenset[Entity]]:
+        index = defaultdict(list)
+
+        for entity, container in self.containments:
+            index[container].append(entity)
+
+        return {key: frozenset(value) for key, value in index.items()}
+
+    def get_containers(self, entity: Entity) -> frozenset[Entity]:
+        return self._container_index.get(entity, frozenset())
+
+    def get_contained_entities(self, entity: Entity) -> frozenset[Entity]:
+        return self._contained_index.get(entity, frozenset())
+
+    def get_ancestry(self, entity: Entity) -> tuple[Entity, ...]:
+        # Entities sharing a name are hash-consed, so one entity may sit in
+        # several containers. The ancestors are listed nearest first.
+        ancestors: dict[Entity, None] = {}
+        frontier = [entity]
+
+        while frontier:
+            next_frontier = []
+
+            for node in frontier:
+                for container in sorted(
+                        self.get_containers(node),
+                        key=attrgetter('name'),
+                ):
+                    if container != entity and container not in ancestors:
+                        ancestors[container] = None
+
+                        next_frontier.append(container)
+
+            frontier = next_frontier
+
+        return tuple(ancestors)
+
+    @cached_property
+    def _path_indexes(
+            self,
+    ) -> dict[
+        tuple[bool, frozenset[ControlType]],
+        dict[Entity, list[ControlActionOrFeedback]],
+    ]:
+        return {}
+
+    def _get_path_index(
+            self,
+            control_types: frozenset[ControlType],
+            reverse: bool = False,
+    ) -> dict[Entity, list[ControlActionOrFeedback]]:
+        # Maps each entity to the control actions and feedbacks leaving it,
+        # or entering it if reversed, sorted so that paths are enumerated in
+        # a deterministic order.
+        key = reverse, control_types
+
+        if key not in self._path_indexes:
+            index = defaultdict(list)
+
+            for control_action_or_feedback in sorted(
+                    self.control_actions_or_feedbacks,
+                    key=lambda control_action_or_feedback: (
+                        control_action_or_feedback.description,
+                        *map(attrgetter('name'), _get_arrow(
+                            control_action_or_feedback,
+                        )),
+                    ),
+            ):
+                if control_action_or_feedback.control_type in control_types:
+                    entity = _get_arrow(control_action_or_feedback)[reverse]
+
+                    index[entity].append(control_action_or_feedback)
+
+            self._path_indexes[key] = dict(index)
+
+        return self._path_indexes[key]
+
+    def _get_distances(
+            self,
+            target: Entity,
+            control_types: frozenset[ControlType],
+    ) -> dict[Entity, int]:
+        predecessors = self._get_path_index(control_types, True)
+        distances = {target: 0}
+        frontier = [target]
+
+        while frontier:
+            next_frontier = []
+
+            for entity in frontier:
+                distance = distances[entity] + 1
+
+                for control_action_or_feedback in predecessors.get(entity, ()):
+                    tail, _ = _get_arrow(control_action_or_feedback)
+
+                    if tail not in distances:
+                        distances[tail] = distance
+
+                        next_frontier.append(tail)
+
+            frontier = next_frontier
+
+        return distances
+
+    def _find_shortest_path(
+            self,
+            source: Entity,
+            target: Entity,
+            control_types: frozenset[ControlType],
+            excluded_entities: Container[Entity] = frozenset(),
+            excluded_control_actions_or_feedbacks: Iterable[
+                ControlActionOrFeedback
+            ] = (),
+    ) -> tuple[ControlActionOrFeedback, ...] | None:
+        # The excluded control actions and feedbacks leave the source.
+        if source == target:
+            return ()
+
+        successors = self._get_path_index(control_types)
+        excluded = set(excluded_control_actions_or_feedbacks)
+        previous: dict[Entity, ControlActionOrFeedback | None] = {
+            source: None,
+        }
+        frontier = [
+            control_action_or_feedback
+            for control_action_or_feedback in successors.get(source, ())
+            if control_action_or_feedback not in excluded
+        ]
+
+        while frontier:
+            next_frontier: list[ControlActionOrFeedback] = []
+
+            for control_action_or_feedback in frontier:
+                _, head = _get_arrow(control_action_or_feedback)
+
+                if head in previous or head in excluded_entities:
+                    continue
+
+                previous[head] = control_action_or_feedback
+
+                if head == target:
+                    path = []
+
+                    while head != source:
+                        edge = previous[head]
+
+                        assert edge is not None
+
+                        path.append(edge)
+
+                        head, _ = _get_arrow(edge)
+
+                    return tuple(reversed(path))
+
+                next_frontier.extend(successors.get(head, ()))
+
+            frontier = next_frontier
+
+        return None
+
+    def get_shortest_path(
+            self,
+            source: Entity,
+            target: Entity,
+            control_types: Iterable[ControlType] = ControlType,
+    ) -> tuple[ControlActionOrFeedback, ...] | None:
+        return self._find_shortest_path(
+            source,
+            target,
+            frozenset(control_types),
+        )
+
+    def iter_simple_paths(
+            self,
+            source: Entity,
+            target: Entity,
+            max_length: int | None = None,
+            control_types: Iterable[ControlType] = ControlType,
+    ) -> Iterator[tuple[ControlActionOrFeedback, ...]]:
+        # A depth-first search, pruning every entity too far from the target
+        # to reach it within the remaining length.
+        control_types = frozenset(control_types)
+        successors = self._get_path_index(control_types)
+        distances = self._get_distances(target, control_types)
+
+        if max_length is None:
+            max_length = len(self._nodes)
+
+        if distances.get(source, max_length + 1) > max_length:
+            return
+
+        if source == target:
+            yield ()
+
+            return
+
+        path: list[ControlActionOrFeedback] = []
+        visited = {source}
+        stack = [iter(successors.get(source, ()))]
+
+        while stack:
+            control_action_or_feedback = next(stack[-1], None)
+
+            if control_action_or_feedback is None:
+                stack.pop()
+
+                if path:
+                    visited.discard(_get_arrow(path.pop())[1])
+
+                continue
+
+            _, head = _get_arrow(control_action_or_feedback)
+
+            if head in visited or (
+                    len(path) + 1 + distances.get(head, max_length)
+                    > max_length
+            ):
+                continue
+
+            if head == target:
+                yield (*path, control_action_or_feedback)
+
+                continue
+
+            path.append(control_action_or_feedback)
+            visited.add(head)
+            stack.append(iter(successors.get(head, ())))
+
+    def iter_shortest_paths(
+            self,
+            source: Entity,
+            target: Entity,
+            control_types: Iterable[ControlType] = ControlType,
+    ) -> Iterator[tuple[ControlActionOrFeedback, ...]]:
+        # Yen's algorithm, yielding the simple paths by increasing length.
+        # Following Lawler, the spurs of a path start where it deviates from
+        # the path it was derived from. The paths are made of the objects of
+        # the path index, so they are told apart by the identities of their
+        # control actions and feedbacks, which is much faster than hashing
+        # them.
+        control_types = frozenset(control_types)
+        path = self._find_shortest_path(source, target, control_types)
+
+        if path is None:
+            return
+
+        paths = [path]
+        deviation = 0
+        candidates: list[
+            tuple[int, int, int, tuple[ControlActionOrFeedback, ...]]
+        ] = []
+        seen = {tuple(map(id, path))}
+
+        yield path
+
+        while True:
+            root_entities = {
+                _get_arrow(control_action_or_feedback)[0]
+                for control_action_or_feedback in path[:deviation]
+            }
+
+            for index in range(deviation, len(path)):
+                root = path[:index]
+                spur, _ = _get_arrow(path[index])
+                spur_path = self._find_shortest_path(
+                    spur,
+                    target,
+                    control_types,
+                    root_entities,
+                    (
+                        other_path[index]
+                        for other_path in paths
+                        if other_path[:index] == root
+                    ),
+                )
+
+                if spur_path is not None:
+                    candidate = root + spur_path
+                    key = tuple(map(id, candidate))
+
+                    if key not in seen:
+                        seen.add(key)
+                        heappush(
+                            candidates,
+                            (len(candidate), len(seen), index, candidate),
+                        )
+
+                root_entities.add(spur)
+
+            if not candidates:
+                return
+
+            _, _, deviation, path = heappop(candidates)
+
+            paths.append(path)
+
+            yield path
+
+    @classmethod
+    def _match(
+            cls,
+            previous_items: set[ControlActionOrFeedback],
+            next_items: set[ControlActionOrFeedback],
+            get_previous_key: Callable[[ControlActionOrFeedback], Hashable],
+            get_next_key: Callable[[ControlActionOrFeedback], Hashable],
+    ) -> frozenset[tuple[ControlActionOrFeedback, ControlActionOrFeedback]]:
+        previous_buckets = defaultdict(list)
+        next_buckets = defaultdict(list)
+        pairs = set()
+
+        for previous_item in previous_items:
+            previous_buckets[get_previous_key(previous_item)].append(
+                previous_item,
+            )
+
+        for next_item in next_items:
+            next_buckets[get_next_key(next_item)].append(next_item)
+
+        # Only an item whose key is unique in both versions is paired, since
+        # any pairing among several items sharing a key would be arbitrary.
+        for key, previous_bucket in previous_buckets.items():
+            next_bucket = next_buckets.get(key, [])
+
+            if len(previous_bucket) == len(next_bucket) == 1:
+                previous_item = previous_bucket[0]
+                next_item = next_bucket[0]
+
+                previous_items.remove(previous_item)
+                next_items.remove(next_item)
+                pairs.add((previous_item, next_item))
+
+        return frozenset(pairs)
+
+    def diff(self, other: ControlStructure) -> ControlStructureDelta:
+        previous_items = set(
+            self.control_actions_or_feedbacks
+            - other.control_actions_or_feedbacks,
+        )
+        next_items = set(
+            other.control_actions_or_feedbacks
+            - self.control_actions_or_feedbacks,
+        )
+
+        def get_flip_key(
+                control_action_or_feedback: ControlActionOrFeedback,
+        ) -> Hashable:
+            return (
+                control_action_or_feedback.description,
+                control_action_or_feedback.control_type,
+                frozenset(
+                    (
+                        control_action_or_feedback.controller,
+                        control_action_or_feedback.controlled,
+                    ),
+                ),
+            )
+
+        def get_flipped_flip_key(
+                control_action_or_feedback: ControlActionOrFeedback,
+        ) -> Hashable:
+            match control_action_or_feedback.control_type:
+                case ControlType.ACTION:
+                    control_type = ControlType.FEEDBACK
+                case ControlType.FEEDBACK:
+                    control_type = ControlType.ACTION
+
+            return get_flip_key(
+                replace_field(
+                    control_action_or_feedback,
+                    control_type=control_type,
+                ),
+            )
+
+        flipped_items = self._match(
+            previous_items,
+            next_items,
+            get_flipped_flip_key,
+            get_flip_key,
+        )
+        get_controller_key = attrgetter(
+            'description',
+            'control_type',
+            'controller',
+        )
+        get_controlled_key = attrgetter(
+            'description',
+            'control_type',
+            'controlled',
+        )
+        rerouted_items = self._match(
+            previous_items,
+            next_items,
+            get_controller_key,
+            get_controller_key,
+        )
+        rerouted_items |= self._match(
+            previous_items,
+            next_items,
+            get_controlled_key,
+            get_controlled_key,
+        )
+
+        return ControlStructureDelta(
+            added_entities=other.entities - self.entities,
+            removed_entities=self.entities - other.entities,
+            added_control_actions_or_feedbacks=frozenset(next_items),
+            removed_control_actions_or_feedbacks=frozenset(previous_items),
+            rerouted_control_actions_or_feedbacks=rerouted_items,
+            flipped_control_actions_or_feedbacks=flipped_items,
+        )
+
+    @cached_property
+    def _nodes(self) -> list[Entity]:
+        nodes = dict.fromkeys(self.entities)
+
+        for control_action_or_feedback in self.control_actions_or_feedbacks:
+            nodes[control_action_or_feedback.controller] = None
+            nodes[control_action_or_feedback.controlled] = None
+
+        return list(nodes)
+
+    @cached_property
+    def strongly_connected_components(self) -> tuple[frozenset[Entity], ...]:
+        successors = defaultdict(list)
+
+        for control_action_or_feedback in self.control_actions_or_feedbacks:
+            source, target = _get_arrow(control_action_or_feedback)
+
+            successors[source].append(target)
+
+        components = _get_strongly_connected_components(
+            self._nodes,
+            successors,
+        )
+
+        # The components are sorted by the names in them, since the order
+        # found depends on the hash order of the entities.
+        return tuple(
+            sorted(
+                map(frozenset, components),
+                key=lambda component: sorted(
+                    entity.name for entity in component
+                ),
+            ),
+        )
+
+    @cached_property
+    def control_loops(self) -> tuple[ControlLoop, ...]:
+        control_loops = []
+
+        for component in self.strongly_connected_components:
+            if len(component) < 2:
+                continue
+
+            for controller in component:
+                actions = defaultdict(list)
+
+                for action in self.get_actions_by_controller(controller):
+                    if action.controlled in component:
+                        actions[action.controlled].append(action)
+
+                feedbacks = defaultdict(list)
+
+                for feedback in self.get_feedbacks_by_controller(controller):
+                    if feedback.controlled in actions:
+                        feedbacks[feedback.controlled].append(feedback)
+
+                for controlled, controlled_feedbacks in feedbacks.items():
+                    control_loop = ControlLoop(
+                        controller,
+                        controlled,
+                        frozenset(actions[controlled]),
+                        frozenset(controlled_feedbacks),
+                    )
+
+                    control_loops.append(control_loop)
+
+        control_loops.sort(
+            key=lambda control_loop: (
+                control_loop.controller.name,
+                control_loop.controlled.name,
+            ),
+        )
+
+        return tuple(control_loops)
+
+    @cached_property
+    def hierarchy_levels(self) -> dict[Entity, int]:
+        # Entities commanding each other share a level. Every other entity
+        # sits one level below the lowest entity commanding it.
+        successors = defaultdict(list)
+
+        for control_action_or_feedback in self.control_actions_or_feedbacks:
+            if control_action_or_feedback.control_type == ControlType.ACTION:
+                successors[control_action_or_feedback.controller].append(
+                    control_action_or_feedback.controlled,
+                )
+
+        components = _get_strongly_connected_components(
+            self._nodes,
+            successors,
+        )
+        component_indices = {}
+
+        for index, component in enumerate(components):
+            for node in component:
+                component_indices[node] = index
+
+        component_levels = [0] * len(components)
+
+        for index in reversed(range(len(components))):
+            level = component_levels[index] + 1
+
+            for node in components[index]:
+                for successor in successors.get(node, ()):
+                    successor_index = component_indices[successor]
+
+                    if successor_index != index:
+                        component_levels[successor_index] = max(
+                            component_levels[successor_index],
+                            level,
+                        )
+
+        return {
+            node: component_levels[component_indices[node]]
+            for node in self._nodes
+        }
+
+    @cached_property
+    def _layers(self) -> list[list[Entity]]:
+        # Orders the entities of each hierarchy level by barycenter sweeps
+        # and keeps the ordering with the fewest crossings between adjacent
+        # levels.
+        levels = self.hierarchy_levels
+        layers: list[list[Entity]] = [
+            [] for _ in range(max(levels.values(), default=-1) + 1)
+        ]
+        neighbors = defaultdict(set)
+
+        for entity in sorted(levels, key=attrgetter('name')):
+            layers[levels[entity]].append(entity)
+
+        for control_action_or_feedback in self.control_actions_or_feedbacks:
+            controller = control_action_or_feedback.controller
+            controlled = control_action_or_feedback.controlled
+
+            if levels[controller] != levels[controlled]:
+                neighbors[controller].add(controlled)
+                neighbors[controlled].add(controller)
+
+        positions = {}
+
+        def update_positions(layer: list[Entity]) -> None:
+            offset = (len(layer) - 1) / 2
+
+            for index, entity in enumerate(layer):
+                positions[entity] = index - offset
+
+        def count_crossings() -> int:
+            return sum(
+                _count_crossings(
+                    (positions[entity], positions[neighbor])
+                    for entity in upper_layer
+                    for neighbor in neighbors[entity]
+                    if levels[neighbor] == levels[entity] + 1
+                )
+                for upper_layer in layers[:-1]
+            )
+
+        def sort_layer(layer: list[Entity], upward: bool) -> None:
+            barycenters = {}
+
+            for entity in layer:
+                total = 0.0
+                count = 0
+
+                for neighbor in neighbors[entity]:
+                    if (levels[neighbor] > levels[entity]) == upward:
+                        total += positions[neighbor]
+                        count += 1
+
+                barycenters[entity] = (
+                    total / count if count else positions[entity]
+                )
+
+            layer.sort(key=barycenters.__getitem__)
+            update_positions(layer)
+
+        for layer in layers:
+            update_positions(layer)
+
+        best_crossings = count_crossings()
+        best_layers = [layer.copy() for layer in layers]
+
+        for _ in range(_LAYOUT_SWEEPS):
+            if not best_crossings:
+                break
+
+            for layer in layers[1:]:
+                sort_layer(layer, False)
+
+            for layer in reversed(layers[:-1]):
+                sort_layer(layer, True)
+
+            crossings = count_crossings()
+
+            if crossings >= best_crossings:
+                break
+
+            best_crossings = crossings
+            best_layers = [layer.copy() for layer in layers]
+
+        return best_layers
+
+    @cached_property
+    def layout(self) -> dict[Entity, tuple[float, float, float, float]]:
+        layout = {}
+        width = max(map(len, self._layers), default=0)
+
+        for level, layer in enumerate(self._layers):
+            offset = (width - len(layer)) / 2
+            y = level * (_ENTITY_HEIGHT + _VERTICAL_SPACING)
+
+            for index, entity in enumerate(layer):
+                x = (offset + index) * (_ENTITY_WIDTH + _HORIZONTAL_SPACING)
+                layout[entity] = x, y, _ENTITY_WIDTH, _ENTITY_HEIGHT
+
+        return layout
+
+    def _iter_cells(self) -> Iterator[ET.Element]:
+        yield ET.Element(CELL_TAG_NAME, id='0')
+        yield ET.Element(
+            CELL_TAG_NAME,
+            id=CONTROL_STRUCTURE_PARENT,
+            parent='0',
+        )
+
+        ids: dict[Entity, str] = {}
+
+        for entity, geometry in sorted(
+                self.layout.items(),
+                key=lambda item: item[0].name,
+        ):
+            ids[entity] = id_ = f'entity-{len(ids) + 1}'
+            cell = ET.Element(
+                CELL_TAG_NAME,
+                id=id_,
+                value=escape(entity.name, False),
+                style=_ENTITY_STYLE,
+                vertex='1',
+                parent=CONTROL_STRUCTURE_PARENT,
+            )
+            x, y, width, height = geometry
+
+            ET.SubElement(
+                cell,
+                GEOMETRY_TAG_NAME,
+                {
+                    'x': f'{x:g}',
+                    'y': f'{y:g}',
+                    'width': f'{width:g}',
+                    'height': f'{height:g}',
+                    'as': 'geometry',
+                },
+            )
+
+            yield cell
+
+        control_actions_or_feedbacks = sorted(
+            self.control_actions_or_feedbacks,
+            key=lambda control_action_or_feedback: (
+                control_action_or_feedback.description,
+                control_action_or_feedback.control_type.value,
+                control_action_or_feedback.controller.name,
+                control_action_or_feedback.controlled.name,
+            ),
+        )
+
+        for index, control_action_or_feedback in enumerate(
+                control_actions_or_feedbacks,
+        ):
+            id_ = f'edge-{index + 1}'
+            controller = ids[control_action_or_feedback.controller]
+            controlled = ids[control_action_or_feedback.controlled]
+
+            # The exit and entry hints outvote the layout, so the control
+            # type survives a round trip whatever the entity positions.
+            match control_action_or_feedback.control_type:
+                case ControlType.ACTION:
+                    source, target = controller, controlled
+                    style = _ACTION_STYLE
+                case ControlType.FEEDBACK:
+                    source, target = controlled, controller
+                    style = _FEEDBACK_STYLE
+                case control_type:
+                    raise ValueError(
+                        f'unknown control type {repr(control_type)}',
+                    )
+
+            cell = ET.Element(
+                CELL_TAG_NAME,
+                id=id_,
+                style=style,
+                edge='1',
+                parent=CONTROL_STRUCTURE_PARENT,
+                source=source,
+                target=target,
+            )
+
+            ET.SubElement(
+                cell,
+                GEOMETRY_TAG_NAME,
+                {'relative': '1', 'as': 'geometry'},
+            )
+
+            yield cell
+
+            if control_action_or_feedback.description:
+                cell = ET.Element(
+                    CELL_TAG_NAME,
+                    id=f'{id_}-label',
+                    value=escape(
+                        control_action_or_feedback.description,
+                        False,
+                    ),
+                    style=_EDGE_LABEL_STYLE,
+                    vertex='1',
+                    connectable='0',
+                    parent=id_,
+                )
+
+                ET.SubElement(
+                    cell,
+                    GEOMETRY_TAG_NAME,
+                    {'relative': '1', 'as': 'geometry'},
+                )
+
+                yield cell
+
+    def _iter_graph_model_chunks(self) -> Iterator[bytes]:
+        yield b'<mxGraphModel><root>'
+
+        for cell in self._iter_cells():
+            yield ET.tostring(cell)
+
+        yield b'</root></mxGraphModel>'
+
+    def write_diagram(
+            self,
+            destination: str | Path,
+            compressed: bool = False,
+            name: str = 'Page-1',
+    ) -> None:
+        chunks = self._iter_graph_model_chunks()
+
+        with open(destination, 'wb') as file:
+            file.write(f'<mxfile><diagram name={quoteattr(name)}>'.encode())
+
+            if compressed:
+                for text in compress_diagram_chunks(chunks):
+                    file.write(text.encode())
+            else:
+                file.writelines(chunks)
+
+            file.write(b'</diagram></mxfile>')
+
+    entities: frozenset[Entity]
+    control_actions_or_feedbacks: frozenset[ControlActionOrFeedback]
+    containments: frozenset[tuple[Entity, Entity]] = frozenset()
+
+
+@dataclass(frozen=True)
+class ControlStructureCache:
+    SUFFIX: ClassVar[str] = '.control-structure'
+    directory: Path
+    max_size: int = 2 ** 26
+    bypass: bool = False
+    defer_eviction: bool = False
+    _size: int | None = field(
+        default=None,
+        init=False,
+        repr=False,
+        compare=False,
+    )
+
+    def get_key(self, content: _Buffer) -> str:
+        hash_ = sha256(f'{PARSER_VERSION} {marshal.version}\n'.encode())
+
+        hash_.update(content)
+
+        return hash_.hexdigest()
+
+    def get_path(self, key: str) -> Path:
+        return self.directory / f'{key}{self.SUFFIX}'
+
+    def dump(self, control_structure: ControlStructure) -> bytes:
+        indices = {}
+        names = []
+        edges = []
+
+        for index, entity in enumerate(control_structure.entities):
+            indices[entity] = index
+
+            names.append(entity.name)
+
+        for control_action_or_feedback in (
+                control_structure.control_actions_or_feedbacks
+        ):
+            edges.append(
+                (
+                    control_action_or_feedback.description,
+                    control_action_or_feedback.control_type.value,
+                    indices[control_action_or_feedback.controller],
+                    indices[control_action_or_feedback.controlled],
+                ),
+            )
+
+        containments = [
+            (indices[entity], indices[container])
+            for entity, container in control_structure.containments
+        ]
+
+        return marshal.dumps((names, edges, containments))
+
+    def load_dump(self, data: bytes) -> ControlStructure:
+        names, edges, containments = marshal.loads(data)
+        entities = list(map(Entity, names))
+        control_actions_or_feedbacks = []
+
+        for description, control_type, controller, controlled in edges:
+            control_action_or_feedback = ControlActionOrFeedback(
+                description,
+                ControlType(control_type),
+                entities[controller],
+                entities[controlled],
+            )
+
+            control_actions_or_feedbacks.append(control_action_or_feedback)
+
+        return ControlStructure(
+            frozenset(entities),
+            frozenset(control_actions_or_feedbacks),
+            frozenset(
+                (entities[entity], entities[container])
+                for entity, container in containments
+            ),
+        )
+
+    def load(self, key: str) -> ControlStructure | None:
+        if self.bypass:
+            return None
+
+        path = self.get_path(key)
+
+        try:
+            control_structure = self.load_dump(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (EOFError, IndexError, TypeError, ValueError):
+            path.unlink(missing_ok=True)
+
+            return None
+
+        utime(path)
+
+        return control_structure
+
+    def store(self, key: str, control_structure: ControlStructure) -> None:
+        if self.bypass:
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        data = self.dump(control_structure)
+
+        with NamedTemporaryFile(
+                dir=self.directory,
+                suffix='.tmp',
+                delete=False,
+        ) as file:
+            file.write(data)
+
+        replace(file.name, self.get_path(key))
+
+        if self.defer_eviction:
+            return
+
+        # The directory is scanned on the first store only. Afterwards its
+        # size is tracked here and it is swept once it passes max_size.
+        if self._size is None:
+            self.evict()
+        else:
+            object.__setattr__(self, '_size', self._size + len(data))
+
+            if self._size > self.max_size:
+                self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        size = 0
+        # Evicting down to three quarters of max_size leaves room for the
+        # next stores before the directory needs to be swept again.
+        target_size = self.max_size - self.max_size // 4
+
+        for path in self.directory.glob(f'*{self.SUFFIX}'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+            size += stat.st_size
+
+        if size > self.max_size:
+            entries.sort()
+
+            for _, entry_size, path in entries:
+                if size <= target_size:
+                    break
+
+                path.unlink(missing_ok=True)
+
+                size -= entry_size
+
+        object.__setattr__(self, '_size', size)
+
+    def clear(self) -> None:
+        for path in self.directory.glob(f'*{self.SUFFIX}'):
+            path.unlink(missing_ok=True)
+
+        object.__setattr__(self, '_size', 0)
+
+
+def _format_control_action_or_feedback(
+        control_action_or_feedback: ControlActionOrFeedback,
+) -> str:
+    return (
+        f'{control_action_or_feedback.control_type.name}'
+        f' {repr(control_action_or_feedback.description)}:'
+        f' {control_action_or_feedback.controller.name}'
+        f' -> {control_action_or_feedback.controlled.name}'
+    )
+
+
+def _get_control_action_or_feedback_dict(
+        control_action_or_feedback: ControlActionOrFeedback,
+) -> dict[str, str]:
+    return {
+        'description': control_action_or_feedback.description,
+        'control_type': control_action_or_feedback.control_type.name,
+        'controller': control_action_or_feedback.controller.name,
+        'controlled': control_action_or_feedback.controlled.name,
+    }
+
+
+@dataclass(frozen=True)
+class ControlStructureDelta:
+    added_entities: frozenset[Entity] = frozenset()
+    removed_entities: frozenset[Entity] = frozenset()
+    changed_entities: frozenset[tuple[Entity, Entity]] = frozenset()
+    added_control_actions_or_feedbacks: frozenset[ControlActionOrFeedback] = (
+        frozenset()
+    )
+    removed_control_actions_or_feedbacks: frozenset[
+        ControlActionOrFeedback
+    ] = frozenset()
+    changed_control_actions_or_feedbacks: frozenset[
+        tuple[ControlActionOrFeedback, ControlActionOrFeedback]
+    ] = frozenset()
+    rerouted_control_actions_or_feedbacks: frozenset[
+        tuple[ControlActionOrFeedback, ControlActionOrFeedback]
+    ] = frozenset()
+    flipped_control_actions_or_feedbacks: frozenset[
+        tuple[ControlActionOrFeedback, ControlActionOrFeedback]
+    ] = frozenset()
+
+    def to_dict(self) -> dict[str, list[Any]]:
+        dict_: dict[str, list[Any]] = {}
+
+        for field_ in fields(self):
+            items = getattr(self, field_.name)
+            format_: Callable[[Any], Any]
+
+            if field_.name.endswith('entities'):
+                format_ = attrgetter('name')
+            else:
+                format_ = _get_control_action_or_feedback_dict
+
+            if field_.name.startswith(('added', 'removed')):
+                dict_[field_.name] = sorted(map(format_, items), key=str)
+            else:
+                dict_[field_.name] = sorted(
+                    (
+                        {'previous': format_(previous), 'next': format_(next_)}
+                        for previous, next_ in items
+                    ),
+                    key=str,
+                )
+
+        return dict_
+
+    def __bool__(self) -> bool:
+        return any(getattr(self, field_.name) for field_ in fields(self))
+
+    def __str__(self) -> str:
+        lines = []
+
+        for field_ in fields(self):
+            items = getattr(self, field_.name)
+
+            format_: Callable[[Any], str]
+
+            if not items:
+                continue
+
+            if field_.name.endswith('entities'):
+                format_ = attrgetter('name')
+            else:
+                format_ = _format_control_action_or_feedback
+
+            title = field_.name.replace('_', ' ').capitalize()
+
+            lines.append(f'{title} ({len(items)}):')
+
+            if field_.name.startswith(('added', 'removed')):
+                lines.extend(sorted(f'  {format_(item)}' for item in items))
+            else:
+                lines.extend(
+                    sorted(
+                        f'  {format_(previous)} => {format_(next_)}'
+                        for previous, next_ in items
+                    ),
+                )
+
+        return '\n'.join(lines)
+
+
+_Record = tuple[dict[str, str], dict[str, str] | None, tuple[_Point, ...]]
+
+
+def _get_placement(record: _Record) -> tuple[str, dict[str, str] | None]:
+    attrib, geometry, _ = record
+
+    return attrib.get('parent', ''), geometry
+
+
+@dataclass
+class IncrementalParser:
+    control_structure: ControlStructure = field(
+        default_factory=lambda: ControlStructure(frozenset(), frozenset()),
+    )
+    _cell_table: _CellTable = field(default_factory=_CellTable)
+    _records: dict[str, _Record] = field(default_factory=dict)
+    _positions: dict[str, int] = field(default_factory=dict)
+    _children: dict[str, set[str]] = field(default_factory=dict)
+    _endpoints: dict[str, set[str]] = field(default_factory=dict)
+    _control_actions_or_feedbacks: dict[str, ControlActionOrFeedback] = (
+        field(default_factory=dict)
+    )
+
+    def _remove(self, id_: str, record: _Record) -> str:
+        attrib, _, _ = record
+        parent = attrib.get('parent', '')
+
+        self._cell_table.entities.pop(id_, None)
+        self._cell_table.geometries.pop(id_, None)
+        self._cell_table.routes.pop(id_, None)
+        self._cell_table.parents.pop(id_, None)
+        self._cell_table.origins.pop(id_, None)
+        self._children.get(parent, set()).discard(id_)
+
+        if id_ in self._cell_table.edges:
+            for endpoint in self._cell_table.edges.pop(id_):
+                self._endpoints[endpoint].discard(id_)
+
+        return parent
+
+    def _add(self, id_: str, record: _Record) -> str:
+        attrib, geometry, points = record
+        parent = attrib.get('parent', '')
+
+        self._cell_table.add(attrib, geometry, points)
+
+        if (
+                parent != CONTROL_STRUCTURE_PARENT
+                and clean_html_text(attrib.get('value', ''))
+        ):
+            self._children.setdefault(parent, set()).add(id_)
+
+        for endpoint in self._cell_table.edges.get(id_, ()):
+            self._endpoints.setdefault(endpoint, set()).add(id_)
+
+        return parent
+
+    def _update_label(self, parent: str) -> None:
+        children = self._children.get(parent)
+
+        if children:
+            id_ = max(children, key=self._positions.__getitem__)
+            attrib, _, _ = self._records[id_]
+            self._cell_table.labels[parent] = clean_html_text(attrib['value'])
+        else:
+            self._cell_table.labels.pop(parent, None)
+
+    def parse_diagram(
+            self,
+            source: _Source,
+    ) -> tuple[ControlStructure, ControlStructureDelta]:
+        records = {}
+        positions: dict[str, int] = {}
+        cell_ids: dict[str, list[str]] = {}
+
+        with _open_model(source) as file:
+            for cell in ControlStructure._iterparse_cells(file, 5, None):
+                unwrapped_cell = _unwrap_cell(cell)
+
+                if unwrapped_cell is None:
+                    continue
+
+                attrib, geometry = unwrapped_cell
+                id_ = attrib['id']
+                records[id_] = (
+                    dict(attrib),
+                    None if geometry is None else dict(geometry.attrib),
+                    (
+                        tuple(_get_points(geometry))
+                        if geometry is not None and attrib.get('edge') == '1'
+                        else ()
+                    ),
+                )
+                positions[id_] = len(positions)
+                cell_ids.setdefault(attrib.get('parent', ''), []).append(id_)
+
+        changed_ids = self._records.keys() - records.keys()
+
+        for id_, record in records.items():
+            if self._records.get(id_) != record:
+                changed_ids.add(id_)
+
+        # The cells inside a moved container are positioned relative to it,
+        # so they are added again with their new page positions.
+        container_ids = [
+            id_
+            for id_ in changed_ids
+            if id_ not in records
+            or id_ not in self._records
+            or _get_placement(records[id_])
+            != _get_placement(self._records[id_])
+        ]
+
+        while container_ids:
+            for id_ in cell_ids.get(container_ids.pop(), ()):
+                if id_ not in changed_ids:
+                    changed_ids.add(id_)
+                    container_ids.append(id_)
+
+        previous_records = self._records
+        self._records = records
+        self._positions = positions
+
+        if not changed_ids:
+            return self.control_structure, ControlStructureDelta()
+
+        previous_entities = {}
+        affected_parents = set()
+        affected_edges = set()
+
+        for id_ in changed_ids:
+            previous_entities[id_] = self._cell_table.entities.get(id_)
+
+            if id_ in previous_records:
+                affected_parents.add(self._remove(id_, previous_records[id_]))
+
+        # Containers are added before the cells they contain, as in a full
+        # parse.
+        for id_ in sorted(
+                changed_ids & records.keys(),
+                key=positions.__getitem__,
+        ):
+            affected_parents.add(self._add(id_, records[id_]))
+
+        for id_ in changed_ids:
+            affected_edges.add(id_)
+            affected_edges.update(self._endpoints.get(id_, ()))
+
+        for parent in affected_parents:
+            self._update_label(parent)
+
+        affected_edges |= affected_parents
+        added_entities = set()
+        removed_entities = set()
+        changed_entities = set()
+
+        for id_, previous_entity in previous_entities.items():
+            entity = self._cell_table.entities.get(id_)
+
+            if previous_entity is None:
+                if entity is not None:
+                    added_entities.add(entity)
+            elif entity is None:
+                removed_entities.add(previous_entity)
+            elif previous_entity != entity:
+                changed_entities.add((previous_entity, entity))
+
+        added_control_actions_or_feedbacks = set()
+        removed_control_actions_or_feedbacks = set()
+        changed_control_actions_or_feedbacks = set()
+
+        control_types = self._cell_table.get_control_types(
+            affected_edges & self._cell_table.edges.keys(),
+        )
+
+        for id_ in affected_edges:
+            previous_control_action_or_feedback = (
+                self._control_actions_or_feedbacks.pop(id_, None)
+            )
+            control_action_or_feedback = None
+
+            if id_ in control_types:
+                control_action_or_feedback = self._cell_table.resolve(
+                    id_,
+                    control_types[id_],
+                )
+                self._control_actions_or_feedbacks[id_] = (
+                    control_action_or_feedback
+                )
+
+            if previous_control_action_or_feedback is None:
+                if control_action_or_feedback is not None:
+                    added_control_actions_or_feedbacks.add(
+                        control_action_or_feedback,
+                    )
+            elif control_action_or_feedback is None:
+                removed_control_actions_or_feedbacks.add(
+                    previous_control_action_or_feedback,
+                )
+            elif previous_control_action_or_feedback != (
+                    control_action_or_feedback
+            ):
+                changed_control_actions_or_feedbacks.add(
+                    (
+                        previous_control_action_or_feedback,
+                        control_action_or_feedback,
+                    ),
+                )
+
+        self.control_structure = ControlStructure(
+            frozenset(self._cell_table.entities.values()),
+            frozenset(self._control_actions_or_feedbacks.values()),
+            self._cell_table.get_containments(),
+        )
+        delta = ControlStructureDelta(
+            frozenset(added_entities),
+            frozenset(removed_entities),
+            frozenset(changed_entities),
+            frozenset(added_control_actions_or_feedbacks),
+            frozenset(removed_control_actions_or_feedbacks),
+            frozenset(changed_control_actions_or_feedbacks),
+        )
+
+        return self.control_structure, delta
+
+
+class ConflictType(Enum):
+    NAME = auto()
+    CONTROL_TYPE = auto()
+
+
+@dataclass(frozen=True)
+class MergeConflict:
+    conflict_type: ConflictType
+    entities: frozenset[Entity] = frozenset()
+    control_actions_or_feedbacks: frozenset[ControlActionOrFeedback] = (
+        frozenset()
+    )
+    sources: frozenset[Hashable] = frozenset()
+
+
+def _get_name_key(entity: Entity) -> str:
+    return ' '.join(entity.name.split()).casefold()
+
+
+def _get_arrow_key(
+        control_action_or_feedback: ControlActionOrFeedback,
+) -> tuple[str, Entity, Entity]:
+    # The arrow as drawn, which an action and a feedback disagreeing on its
+    # control type share.
+    return (
+        control_action_or_feedback.description,
+        *_get_arrow(control_action_or_feedback),
+    )
+
+
+_Item = Entity | ControlActionOrFeedback | tuple[Entity, Entity]
+_I = TypeVar('_I', Entity, ControlActionOrFeedback, tuple[Entity, Entity])
+
+
+@dataclass
+class FederatedControlStructure:
+    _control_structures: dict[Hashable, ControlStructure] = field(
+        default_factory=dict,
+    )
+    _sources: dict[_Item, set[Hashable]] = field(default_factory=dict)
+    _entities: dict[str, Entity] = field(default_factory=dict)
+    _name_index: dict[str, set[Entity]] = field(default_factory=dict)
+    _arrow_index: dict[
+        tuple[str, Entity, Entity],
+        set[ControlActionOrFeedback],
+    ] = field(default_factory=dict)
+    _name_conflicts: set[str] = field(default_factory=set)
+    _arrow_conflicts: set[tuple[str, Entity, Entity]] = field(
+        default_factory=set,
+    )
+    _control_structure: ControlStructure | None = None
+
+    @classmethod
+    def merge(
+            cls,
+            control_structures: Mapping[_T, ControlStructure],
+    ) -> FederatedControlStructure:
+        federated_control_structure = cls()
+
+        for source, control_structure in control_structures.items():
+            federated_control_structure.update(source, control_structure)
+
+        return federated_control_structure
+
+    def _add_entity(self, entity: Entity) -> None:
+        key = _get_name_key(entity)
+        entities = self._name_index.setdefault(key, set())
+
+        self._entities[entity.name] = entity
+
+        entities.add(entity)
+
+        if len(entities) > 1:
+            self._name_conflicts.add(key)
+
+    def _remove_entity(self, entity: Entity) -> None:
+        key = _get_name_key(entity)
+        entities = self._name_index[key]
+
+        del self._entities[entity.name]
+
+        entities.discard(entity)
+
+        if len(entities) < 2:
+            self._name_conflicts.discard(key)
+
+        if not entities:
+            del self._name_index[key]
+
+    def _add_control_action_or_feedback(
+            self,
+            control_action_or_feedback: ControlActionOrFeedback,
+    ) -> None:
+        key = _get_arrow_key(control_action_or_feedback)
+        control_actions_or_feedbacks = self._arrow_index.setdefault(key, set())
+
+        control_actions_or_feedbacks.add(control_action_or_feedback)
+
+        if len(control_actions_or_feedbacks) > 1:
+            self._arrow_conflicts.add(key)
+
+    def _remove_control_action_or_feedback(
+            self,
+            control_action_or_feedback: ControlActionOrFeedback,
+    ) -> None:
+        key = _get_arrow_key(control_action_or_feedback)
+        control_actions_or_feedbacks = self._arrow_index[key]
+
+        control_actions_or_feedbacks.discard(control_action_or_feedback)
+
+        if len(control_actions_or_feedbacks) < 2:
+            self._arrow_conflicts.discard(key)
+
+        if not control_actions_or_feedbacks:
+            del self._arrow_index[key]
+
+    def _update_sources(
+            self,
+            source: Hashable,
+            previous_items: frozenset[_I],
+            items: frozenset[_I],
+    ) -> tuple[set[_I], set[_I]]:
+        added_items = set()
+        removed_items = set()
+
+        for item in previous_items - items:
+            sources = self._sources[item]
+
+            sources.discard(source)
+
+            if not sources:
+                del self._sources[item]
+
+                removed_items.add(item)
+
+        for item in items - previous_items:
+            sources = self._sources.setdefault(item, set())
+
+            if not sources:
+                added_items.add(item)
+
+            sources.add(source)
+
+        return added_items, removed_items
+
+    def update(
+            self,
+            source: Hashable,
+            control_structure: ControlStructure,
+    ) -> ControlStructureDelta:
+        # Only the items the source gained or lost are touched, and an item
+        # enters or leaves the merged structure with its first or last
+        # source.
+        previous_control_structure = self._control_structures.get(
+            source,
+            ControlStructure(frozenset(), frozenset()),
+        )
+        self._control_structures[source] = control_structure
+        added_entities, removed_entities = self._update_sources(
+            source,
+            previous_control_structure.entities,
+            control_structure.entities,
+        )
+        (
+            added_control_actions_or_feedbacks,
+            removed_control_actions_or_feedbacks,
+        ) = self._update_sources(
+            source,
+            previous_control_structure.control_actions_or_feedbacks,
+            control_structure.control_actions_or_feedbacks,
+        )
+
+        self._update_sources(
+            source,
+            previous_control_structure.containments,
+            control_structure.containments,
+        )
+
+        for entity in removed_entities:
+            self._remove_entity(entity)
+
+        for entity in added_entities:
+            self._add_entity(entity)
+
+        for control_action_or_feedback in (
+                removed_control_actions_or_feedbacks
+        ):
+            self._remove_control_action_or_feedback(control_action_or_feedback)
+
+        for control_action_or_feedback in added_control_actions_or_feedbacks:
+            self._add_control_action_or_feedback(control_action_or_feedback)
+
+        delta = ControlStructureDelta(
+            added_entities=frozenset(added_entities),
+            removed_entities=frozenset(removed_entities),
+            added_control_actions_or_feedbacks=frozenset(
+                added_control_actions_or_feedbacks,
+            ),
+            removed_control_actions_or_feedbacks=frozenset(
+                removed_control_actions_or_feedbacks,
+            ),
+        )
+
+        if delta or previous_control_structure.containments != (
+                control_structure.containments
+        ):
+            self._control_structure = None
+
+        return delta
+
+    def remove(self, source: Hashable) -> ControlStructureDelta:
+        delta = self.update(
+            source,
+            ControlStructure(frozenset(), frozenset()),
+        )
+
+        del self._control_structures[source]
+
+        return delta
+
+    @property
+    def control_structure(self) -> ControlStructure:
+        if self._control_structure is None:
+            entities = set()
+            control_actions_or_feedbacks = set()
+            containments = set()
+
+            for item in self._sources:
+                if isinstance(item, Entity):
+                    entities.add(item)
+                elif isinstance(item, ControlActionOrFeedback):
+                    control_actions_or_feedbacks.add(item)
+                else:
+                    containments.add(item)
+
+            self._control_structure = ControlStructure(
+                frozenset(entities),
+                frozenset(control_actions_or_feedbacks),
+                frozenset(containments),
+            )
+
+        return self._control_structure
+
+    @property
+    def sources(self) -> frozenset[Hashable]:
+        return frozenset(self._control_structures)
+
+    def get_control_structure(self, source: Hashable) -> ControlStructure:
+        return self._control_structures[source]
+
+    def get_entity(self, name: str) -> Entity | None:
+        return self._entities.get(name)
+
+    def get_sources(self, item: _Item) -> frozenset[Hashable]:
+        return frozenset(self._sources.get(item, ()))
+
+    @property
+    def conflicts(self) -> list[MergeConflict]:
+        conflicts = []
+
+        # The conflicts are sorted by type and then by the names involved,
+        # since the conflict sets are in hash order.
+        for key in sorted(self._name_conflicts):
+            entities = frozenset(self._name_index[key])
+            conflicts.append(
+                MergeConflict(
+                    ConflictType.NAME,
+                    entities=entities,
+                    sources=frozenset().union(
+                        *map(self.get_sources, entities),
+                    ),
+                ),
+            )
+
+        for arrow_key in sorted(
+                self._arrow_conflicts,
+                key=lambda arrow_key: (
+                    arrow_key[0],
+                    arrow_key[1].name,
+                    arrow_key[2].name,
+                ),
+        ):
+            control_actions_or_feedbacks = frozenset(
+                self._arrow_index[arrow_key],
+            )
+            conflicts.append(
+                MergeConflict(
+                    ConflictType.CONTROL_TYPE,
+                    control_actions_or_feedbacks=control_actions_or_feedbacks,
+                    sources=frozenset().union(
+                        *map(self.get_sources, control_actions_or_feedbacks),
+                    ),
+                ),
+            )
+
+        return conflicts
@@ -1,41 +1,118 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, fields
+from enum import auto, Enum
+from functools import cache
 from re import compile, fullmatch, Pattern
-from typing import ClassVar
+from typing import (
+    Any,
+    ClassVar,
+    get_type_hints,
+    Literal,
+    overload,
+    Self,
+    TypeVar,
+)
 from warnings import warn
 
 
+_D = TypeVar('_D', bound='Definition')
+
+
 @dataclass(repr=False)
 class Definition(ABC):
     _NAME_PATTERN: ClassVar[Pattern[str]]
-    __lookup: ClassVar[dict[str, Definition]] = {}
     name: str
 
     @classmethod
     def clear(cls) -> None:
-        cls.__lookup.clear()
+        Registry.get_current().clear()
+
+    @overload
+    @classmethod
+    def get(cls, name: str, *, lazy: Literal[False] = False) -> Definition:
+        pass
 
+    @overload
     @classmethod
-    def get(cls, name: str) -> Definition:
-        return cls.__lookup[name]
+    def get(cls, name: str, *, lazy: bool) -> Any:
+        pass
+
+    @classmethod
+    def get(cls, name: str, *, lazy: bool = False) -> Any:
+        return Registry.get_current().get(name, lazy=lazy)
+
+    @overload
+    @classmethod
+    def get_all(
+            cls,
+            *names: str,
+            lazy: Literal[False] = False,
+    ) -> list[Definition]:
+        pass
+
+    @overload
+    @classmethod
+    def get_all(cls, *names: str, lazy: bool) -> list[Any]:
+        pass
+
+    @classmethod
+    def get_all(cls, *names: str, lazy: bool = False) -> list[Any]:
+        return Registry.get_current().get_all(*names, lazy=lazy)
+
+    @overload
+    def get_referrers(self) -> list[Definition]:
+        pass
+
+    @overload
+    def get_referrers(self, type_: type[_D]) -> list[_D]:
+        pass
+
+    def get_referrers(
+            self,
+            type_: type[Definition] | None = None,
+    ) -> list[Any]:
+        if type_ is None:
+            return self._registry.get_referrers(self.name)
+
+        return self._registry.get_referrers(self.name, type_)
 
     @classmethod
-    def get_all(cls, *names: str) -> list[Definition]:
-        return list(map(cls.get, names))
+    def bulk_create(
+            cls,
+            rows: Iterable[Sequence[Any] | Mapping[str, Any]],
+    ) -> tuple[list[Self], list[Diagnostic]]:
+        # Creates a definition from the positional or keyword arguments of
+        # each row with deferred validation.
+        with Registry.get_current().defer_validation() as diagnostics:
+            definitions = [
+                cls(**row) if isinstance(row, Mapping) else cls(*row)
+                for row in rows
+            ]
+
+        return definitions, diagnostics
 
     def __post_init__(self) -> None:
-        if self.name in self.__lookup:
-            warn(f'name {repr(self.name)} is already defined')
+        # The registry is kept outside the fields, so that it takes no part
+        # in comparisons, and queried by get_referrers even when another
+        # registry is current.
+        self._registry = Registry.get_current()
+
+        self._registry.register(self)
+
+        validation = _DEFERRED_VALIDATION.get()
 
-        if not fullmatch(self._NAME_PATTERN, self.name):
+        if validation is not None:
+            validation.definitions.append(self)
+        elif not fullmatch(self._NAME_PATTERN, self.name):
             warn(
                 f'name {repr(self.name)} doesn\'t follow the standard pattern',
             )
 
-        self.__lookup[self.name] = self
-
     def __repr__(self) -> str:
         return self.name
 
@@ -44,6 +121,552 @@ class Definition(ABC):
         pass
 
 
+class DiagnosticType(Enum):
+    DUPLICATE_NAME = auto()
+    NONSTANDARD_NAME = auto()
+
+
+@dataclass(frozen=True)
+class Diagnostic:
+    diagnostic_type: DiagnosticType
+    name: str
+    message: str
+
+
+@dataclass
+class _Validation:
+    definitions: list[Definition] = field(default_factory=list)
+    duplicate_names: list[str] = field(default_factory=list)
+
+    def get_diagnostics(self) -> list[Diagnostic]:
+        diagnostics = [
+            Diagnostic(
+                DiagnosticType.DUPLICATE_NAME,
+                name,
+                f'name {repr(name)} is already defined',
+            )
+            for name in self.duplicate_names
+        ]
+
+        for definition in self.definitions:
+            if definition._NAME_PATTERN.fullmatch(definition.name) is None:
+                diagnostics.append(
+                    Diagnostic(
+                        DiagnosticType.NONSTANDARD_NAME,
+                        definition.name,
+                        (
+                            f'name {repr(definition.name)} doesn\'t follow the'
+                            ' standard pattern'
+                        ),
+                    ),
+                )
+
+        return diagnostics
+
+
+_DEFERRED_VALIDATION: ContextVar[_Validation | None] = ContextVar(
+    'deferred_validation',
+    default=None,
+)
+
+
+@dataclass(eq=False, repr=False, slots=True)
+class Reference:
+    # A proxy for the definition of a name, which is looked up in the
+    # registry current when the proxy was created on first access, so the
+    # definition may be created later.
+    name: str
+    registry: Registry
+    _definition: Definition | None = field(default=None, init=False)
+
+    def resolve(self) -> Definition:
+        if self._definition is None:
+            self._definition = self.registry.get(self.name)
+
+        return self._definition
+
+    def _try_resolve(self) -> Definition | None:
+        if self._definition is None and self.name in self.registry:
+            self._definition = self.registry.get(self.name)
+
+        return self._definition
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('__'):
+            raise AttributeError(name)
+
+        return getattr(self.resolve(), name)
+
+    def __eq__(self, other: object) -> bool:
+        # A proxy of a name that is not defined yet only equals the proxies
+        # of the same name in the same registry.
+        definition = self._try_resolve()
+
+        if isinstance(other, Reference):
+            other_definition = other._try_resolve()
+
+            if definition is None or other_definition is None:
+                return (
+                    self.name == other.name
+                    and self.registry is other.registry
+                )
+
+            other = other_definition
+
+        return definition is not None and definition == other
+
+    def __repr__(self) -> str:
+        return self.name
+
+    def __str__(self) -> str:
+        return str(self.resolve())
+
+
+@cache
+def _get_reference_field_names(type_: type[Definition]) -> tuple[str, ...]:
+    # Fields of strings can't hold references.
+    type_hints = get_type_hints(type_)
+
+    return tuple(
+        field_.name
+        for field_ in fields(type_)
+        if type_hints[field_.name] not in (str, str | None)
+    )
+
+
+_DEFINITION_TYPES: dict[type[object], bool] = {}
+
+
+def _is_definition_type(type_: type[object]) -> bool:
+    # Checking for an instance of an abstract class is slow.
+    if type_ not in _DEFINITION_TYPES:
+        _DEFINITION_TYPES[type_] = issubclass(type_, Definition)
+
+    return _DEFINITION_TYPES[type_]
+
+
+def _get_references(
+        definition: Definition,
+) -> list[Definition | Reference]:
+    references: list[Definition | Reference] = []
+
+    for field_name in _get_reference_field_names(type(definition)):
+        value = getattr(definition, field_name)
+
+        for item in value if isinstance(value, (list, tuple)) else (value,):
+            if isinstance(item, Reference) or _is_definition_type(type(item)):
+                references.append(item)
+
+    return references
+
+
+@dataclass
+class _Bitset:
+    # An int bitset collecting its new bits in a list until it is read, as
+    # setting them one by one would copy the whole int each time.
+    bits: int = 0
+    pending: list[int] = field(default_factory=list)
+
+    def add(self, index: int) -> None:
+        self.pending.append(index)
+
+    def get(self) -> int:
+        if self.pending:
+            buffer = bytearray(max(self.pending) // 8 + 1)
+
+            for index in self.pending:
+                buffer[index >> 3] |= 1 << (index & 7)
+
+            self.bits |= int.from_bytes(buffer, 'little')
+
+            self.pending.clear()
+
+        return self.bits
+
+
+@dataclass
+class _TraceabilityClosure:
+    # Each name has a dense id. The few ids a definition transitively traces
+    # to (upstream) are a set, and the ids of the possibly many definitions
+    # tracing to it (downstream) are a bitset. A definition must be added
+    # after everything it references, which holds for new definitions.
+    ids: dict[str, int] = field(default_factory=dict)
+    names: list[str] = field(default_factory=list)
+    upstreams: list[frozenset[int]] = field(default_factory=list)
+    downstreams: list[_Bitset | None] = field(default_factory=list)
+    type_masks: dict[type[Definition], _Bitset] = field(default_factory=dict)
+
+    def get_id(self, name: str) -> int:
+        id_ = self.ids.get(name)
+
+        if id_ is None:
+            id_ = self.ids[name] = len(self.names)
+
+            self.names.append(name)
+            self.upstreams.append(frozenset())
+            self.downstreams.append(None)
+
+        return id_
+
+    def add(
+            self,
+            definition: Definition,
+            references: list[Definition | Reference],
+    ) -> None:
+        id_ = self.get_id(definition.name)
+        upstream = set()
+
+        for reference in references:
+            reference_id = self.get_id(reference.name)
+
+            upstream.add(reference_id)
+            upstream.update(self.upstreams[reference_id])
+
+        upstream.discard(id_)
+
+        self.upstreams[id_] = frozenset(upstream)
+
+        for upstream_id in upstream:
+            downstream = self.downstreams[upstream_id]
+
+            if downstream is None:
+                downstream = self.downstreams[upstream_id] = _Bitset()
+
+            downstream.add(id_)
+
+        self.type_masks.setdefault(type(definition), _Bitset()).add(id_)
+
+    def get_type_mask(self, type_: type[Definition] | None) -> int:
+        if type_ is None:
+            return -1
+
+        mask = 0
+
+        for other_type, type_mask in self.type_masks.items():
+            if issubclass(other_type, type_):
+                mask |= type_mask.get()
+
+        return mask
+
+
+@dataclass(eq=False)
+class Registry:
+    # The definitions of one analysis. Definitions are registered in and
+    # looked up from the current registry, which activate sets for the
+    # current thread or asyncio task only. The referrers of each name are
+    # indexed by their types as definitions are registered, and so is the
+    # traceability closure, unless a name was referenced before it was
+    # registered, in which case the closure is rebuilt when next queried.
+    definitions: dict[str, Definition] = field(default_factory=dict)
+    _referrers: dict[
+        str,
+        dict[type[Definition], dict[str, Definition]],
+    ] = field(default_factory=dict, init=False, repr=False)
+    _closure: _TraceabilityClosure | None = field(
+        default_factory=_TraceabilityClosure,
+        init=False,
+        repr=False,
+    )
+
+    @classmethod
+    def get_current(cls) -> Registry:
+        return _CURRENT_REGISTRY.get()
+
+    @contextmanager
+    def activate(self) -> Iterator[Registry]:
+        token = _CURRENT_REGISTRY.set(self)
+
+        try:
+            yield self
+        finally:
+            _CURRENT_REGISTRY.reset(token)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.definitions
+
+    def __len__(self) -> int:
+        return len(self.definitions)
+
+    def clear(self) -> None:
+        self.definitions.clear()
+        self._referrers.clear()
+
+        self._closure = _TraceabilityClosure()
+
+    @contextmanager
+    def defer_validation(self) -> Iterator[list[Diagnostic]]:
+        # Activates the registry, and checks the names of the definitions
+        # created inside in one pass at the end, filling the yielded list
+        # with diagnostics instead of warning.
+        validation = _Validation()
+        diagnostics: list[Diagnostic] = []
+        token = _DEFERRED_VALIDATION.set(validation)
+
+        try:
+            with self.activate():
+                yield diagnostics
+        finally:
+            _DEFERRED_VALIDATION.reset(token)
+
+        diagnostics.extend(validation.get_diagnostics())
+
+    def register(self, definition: Definition) -> None:
+        if definition.name in self.definitions:
+            validation = _DEFERRED_VALIDATION.get()
+
+            if validation is None:
+                warn(f'name {repr(definition.name)} is already defined')
+            else:
+                validation.duplicate_names.append(definition.name)
+
+            self._unindex(self.definitions[definition.name])
+
+        self.definitions[definition.name] = definition
+        references = _get_references(definition)
+
+        self._index(definition, references)
+
+        if self._closure is not None:
+            if definition.name in self._closure.ids:
+                self._closure = None
+            else:
+                self._closure.add(definition, references)
+
+    def _get_closure(self) -> _TraceabilityClosure:
+        # Rebuilds the closure adding the definitions after the definitions
+        # they reference, ignoring references closing a cycle.
+        if self._closure is None:
+            closure = _TraceabilityClosure()
+            visited = set()
+
+            def visit(name: str) -> None:
+                if name in visited:
+                    return
+
+                visited.add(name)
+
+                definition = self.definitions.get(name)
+
+                if definition is None:
+                    closure.get_id(name)
+                else:
+                    references = _get_references(definition)
+
+                    for reference in references:
+                        visit(reference.name)
+
+                    closure.add(definition, references)
+
+            for name in self.definitions:
+                visit(name)
+
+            self._closure = closure
+
+        return self._closure
+
+    def _get_traced(
+            self,
+            bits: int,
+            type_: type[Definition] | None,
+    ) -> list[Definition]:
+        closure = self._get_closure()
+        bits &= closure.get_type_mask(type_)
+        traced = []
+
+        # Reading the bits off the binary string is much faster than
+        # isolating each of them when there are many.
+        for id_, bit in enumerate(bin(bits)[:1:-1]):
+            if bit == '1':
+                name = closure.names[id_]
+
+                if name in self.definitions:
+                    traced.append(self.definitions[name])
+
+        return traced
+
+    def _index(
+            self,
+            definition: Definition,
+            references: list[Definition | Reference],
+    ) -> None:
+        for reference in references:
+            referrers = self._referrers.setdefault(reference.name, {})
+
+            referrers.setdefault(type(definition), {})[definition.name] = (
+                definition
+            )
+
+    def _unindex(self, definition: Definition) -> None:
+        for reference in _get_references(definition):
+            referrers = self._referrers.get(reference.name, {})
+
+            referrers.get(type(definition), {}).pop(definition.name, None)
+
+    @overload
+    def get(self, name: str, *, lazy: Literal[False] = False) -> Definition:
+        pass
+
+    @overload
+    def get(self, name: str, *, lazy: bool) -> Any:
+        pass
+
+    def get(self, name: str, *, lazy: bool = False) -> Any:
+        if lazy:
+            return Reference(name, self)
+
+        return self.definitions[name]
+
+    @overload
+    def get_all(
+            self,
+            *names: str,
+            lazy: Literal[False] = False,
+    ) -> list[Definition]:
+        pass
+
+    @overload
+    def get_all(self, *names: str, lazy: bool) -> list[Any]:
+        pass
+
+    def get_all(self, *names: str, lazy: bool = False) -> list[Any]:
+        return [self.get(name, lazy=lazy) for name in names]
+
+    def get_dangling_names(self) -> list[str]:
+        return [
+            name
+            for name, referrers in self._referrers.items()
+            if name not in self.definitions and any(referrers.values())
+        ]
+
+    def resolve_all(self) -> None:
+        # Replaces every reference proxy in the definitions by its
+        # definition, once no name is dangling.
+        dangling_names = self.get_dangling_names()
+
+        if dangling_names:
+            raise ValueError(f'undefined names {repr(dangling_names)}')
+
+        for definition in self.definitions.values():
+            for field_name in _get_reference_field_names(type(definition)):
+                value = getattr(definition, field_name)
+
+                if isinstance(value, Reference):
+                    setattr(definition, field_name, value.resolve())
+                elif isinstance(value, list):
+                    for index, item in enumerate(value):
+                        if isinstance(item, Reference):
+                            value[index] = item.resolve()
+                elif isinstance(value, tuple):
+                    setattr(
+                        definition,
+                        field_name,
+                        tuple(
+                            item.resolve()
+                            if isinstance(item, Reference)
+                            else item
+                            for item in value
+                        ),
+                    )
+
+    @overload
+    def get_referrers(self, name: str) -> list[Definition]:
+        pass
+
+    @overload
+    def get_referrers(self, name: str, type_: type[_D]) -> list[_D]:
+        pass
+
+    def get_referrers(
+            self,
+            name: str,
+            type_: type[Definition] | None = None,
+    ) -> list[Any]:
+        referrers: list[Definition] = []
+
+        for referrer_type, typed_referrers in self._referrers.get(
+                name,
+                {},
+        ).items():
+            if type_ is None or issubclass(referrer_type, type_):
+                referrers.extend(typed_referrers.values())
+
+        return referrers
+
+    @overload
+    def get_upstream(self, name: str) -> list[Definition]:
+        pass
+
+    @overload
+    def get_upstream(self, name: str, type_: type[_D]) -> list[_D]:
+        pass
+
+    def get_upstream(
+            self,
+            name: str,
+            type_: type[Definition] | None = None,
+    ) -> list[Any]:
+        closure = self._get_closure()
+        id_ = closure.ids.get(name)
+
+        if id_ is None:
+            return []
+
+        upstream = []
+
+        for upstream_id in sorted(closure.upstreams[id_]):
+            definition = self.definitions.get(closure.names[upstream_id])
+
+            if definition is not None and (
+                    type_ is None or isinstance(definition, type_)
+            ):
+                upstream.append(definition)
+
+        return upstream
+
+    @overload
+    def get_downstream(self, name: str) -> list[Definition]:
+        pass
+
+    @overload
+    def get_downstream(self, name: str, type_: type[_D]) -> list[_D]:
+        pass
+
+    def get_downstream(
+            self,
+            name: str,
+            type_: type[Definition] | None = None,
+    ) -> list[Any]:
+        closure = self._get_closure()
+        id_ = closure.ids.get(name)
+
+        if id_ is None:
+            return []
+
+        downstream = closure.downstreams[id_]
+
+        if downstream is None:
+            return []
+
+        return self._get_traced(downstream.get(), type_)
+
+    def get_referrers_by_type(
+            self,
+            name: str,
+    ) -> dict[type[Definition], list[Definition]]:
+        return {
+            referrer_type: list(typed_referrers.values())
+            for referrer_type, typed_referrers in self._referrers.get(
+                name,
+                {},
+            ).items()
+            if typed_referrers
+        }
+
+
+DEFAULT_REGISTRY = Registry()
+_CURRENT_REGISTRY = ContextVar('registry', default=DEFAULT_REGISTRY)
+
+
 @dataclass(repr=False)
 class Loss(Definition):
     _NAME_PATTERN = compile(r'L-\d+')
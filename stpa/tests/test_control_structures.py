@@ -0,0 +1,1658 @@
+from copy import deepcopy
+from io import BytesIO
+from importlib import import_module
+from itertools import islice
+from pathlib import Path
+from math import nan
+from os import environ
+from pickle import dumps, loads
+from random import Random
+from struct import pack
+from tarfile import open as open_tar_file
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+from urllib.parse import quote
+from zipfile import ZipFile
+from zlib import compress, crc32
+import xml.etree.ElementTree as ET
+
+from stpa.control_structures import (
+    ConflictType,
+    ControlActionOrFeedback,
+    ControlStructure,
+    ControlStructureCache,
+    ControlLoop,
+    ControlStructureDelta,
+    ControlType,
+    Entity,
+    FederatedControlStructure,
+    IncrementalParser,
+    MergeConflict,
+    ParseTimings,
+    XML_BACKEND_VARIABLE,
+    XMLBackend,
+)
+from stpa.utilities import compress_diagram
+
+
+class UnseekableBytesIO(BytesIO):
+    def seekable(self) -> bool:
+        return False
+
+
+class ControlStructureTestCase(TestCase):
+    def setUp(self) -> None:
+        self.temporary_directory = TemporaryDirectory()
+        self.directory = Path(self.temporary_directory.name)
+
+    def tearDown(self) -> None:
+        self.temporary_directory.cleanup()
+
+    def get_example_paths(self) -> list[Path]:
+        examples = import_module('stpa.examples')
+        pathname = examples.__file__
+
+        assert isinstance(pathname, str)
+
+        return sorted(Path(pathname).parent.glob('**/*.drawio.xml'))
+
+    def compress_example(self, path: Path) -> Path:
+        tree = ET.parse(path)
+
+        for diagram in tree.getroot():
+            model = diagram[0]
+            diagram.text = compress_diagram(ET.tostring(model))
+
+            diagram.remove(model)
+
+        compressed_path = self.directory / path.name
+
+        tree.write(compressed_path)
+
+        return compressed_path
+
+    def get_figure_2_11_path(self) -> Path:
+        chapter_2 = import_module('stpa.examples.stpa_handbook.chapter_2')
+        pathname = chapter_2.__file__
+
+        assert isinstance(pathname, str)
+
+        return Path(pathname).parent / 'figure-2.11.drawio.xml'
+
+    def test_parse_diagram_streaming(self) -> None:
+        paths = self.get_example_paths()
+
+        self.assertTrue(paths)
+
+        for path in paths:
+            with self.subTest(path=path.name):
+                self.assertEqual(
+                    ControlStructure.parse_diagram(path, streaming=True),
+                    ControlStructure.parse_diagram(path),
+                )
+
+    def test_parse_diagram_compressed(self) -> None:
+        for path in self.get_example_paths():
+            compressed_path = self.compress_example(path)
+
+            for streaming in (False, True):
+                with self.subTest(path=path.name, streaming=streaming):
+                    timings = ParseTimings()
+
+                    self.assertEqual(
+                        ControlStructure.parse_diagram(
+                            compressed_path,
+                            streaming,
+                            timings,
+                        ),
+                        ControlStructure.parse_diagram(path),
+                    )
+                    self.assertGreater(timings.decode, 0)
+                    self.assertGreater(timings.parse, 0)
+
+    def test_parse_diagram_backends(self) -> None:
+        invalid_path = self.directory / 'invalid.drawio.xml'
+
+        invalid_path.write_text('<mxfile>')
+
+        for path in self.get_example_paths():
+            expected_control_structure = ControlStructure.parse_diagram(path)
+            compressed_path = self.compress_example(path)
+
+            for backend in XMLBackend.get_available():
+                for streaming in (False, True):
+                    with self.subTest(
+                            path=path.name,
+                            backend=backend,
+                            streaming=streaming,
+                    ):
+                        for source in path, compressed_path:
+                            self.assertEqual(
+                                ControlStructure.parse_diagram(
+                                    source,
+                                    streaming,
+                                    backend=backend,
+                                ),
+                                expected_control_structure,
+                            )
+
+                        with self.assertRaises(ET.ParseError):
+                            ControlStructure.parse_diagram(
+                                invalid_path,
+                                streaming,
+                                backend=backend,
+                            )
+
+    def test_parse_diagram_default_backend(self) -> None:
+        path = self.get_figure_2_11_path()
+        expected_control_structure = ControlStructure.parse_diagram(path)
+
+        for backend in XMLBackend.get_available():
+            with (
+                    self.subTest(backend=backend),
+                    patch.dict(environ, {XML_BACKEND_VARIABLE: backend.value}),
+            ):
+                self.assertIs(XMLBackend.get_default(), backend)
+                self.assertEqual(
+                    ControlStructure.parse_diagram(path),
+                    expected_control_structure,
+                )
+
+        with patch.dict(environ, {XML_BACKEND_VARIABLE: 'bogus'}):
+            with self.assertRaisesRegex(ValueError, XML_BACKEND_VARIABLE):
+                ControlStructure.parse_diagram(path)
+
+            self.assertEqual(
+                ControlStructure.parse_diagram(
+                    path,
+                    backend=XMLBackend.EXPAT,
+                ),
+                expected_control_structure,
+            )
+
+        with (
+                patch.dict(environ, {XML_BACKEND_VARIABLE: 'lxml'}),
+                patch('stpa.control_structures.lxml_etree', None),
+                self.assertRaisesRegex(ValueError, 'lxml is not installed'),
+        ):
+            ControlStructure.parse_diagram(path)
+
+    def test_parse_diagram_buffers_and_streams(self) -> None:
+        cache = ControlStructureCache(self.directory / 'cache')
+
+        for path in self.get_example_paths():
+            content = path.read_bytes()
+            expected_control_structure = ControlStructure.parse_diagram(path)
+
+            for source in (
+                    content,
+                    bytearray(content),
+                    memoryview(content),
+                    BytesIO(content),
+            ):
+                with self.subTest(path=path.name, source=type(source)):
+                    for backend in XMLBackend.get_available():
+                        if isinstance(source, BytesIO):
+                            source.seek(0)
+
+                        self.assertEqual(
+                            ControlStructure.parse_diagram(
+                                source,
+                                backend=backend,
+                            ),
+                            expected_control_structure,
+                        )
+
+                    if isinstance(source, BytesIO):
+                        source.seek(0)
+
+                    self.assertEqual(
+                        ControlStructure.parse_diagram(source, cache=cache),
+                        expected_control_structure,
+                    )
+
+    def test_parse_archive(self) -> None:
+        paths = self.get_example_paths()
+        zip_path = self.directory / 'diagrams.zip'
+        tar_path = self.directory / 'diagrams.tar.gz'
+
+        with ZipFile(zip_path, 'w') as zip_file:
+            for path in paths:
+                zip_file.write(path, f'diagrams/{path.name}')
+
+            zip_file.writestr('invalid.drawio.xml', '<mxfile>')
+            zip_file.writestr('notes.txt', '')
+
+        with open_tar_file(tar_path, 'w:gz') as tar_file:
+            for path in paths:
+                tar_file.add(path, f'diagrams/{path.name}')
+
+        for source, invalid_names in (
+                (zip_path, {'invalid.drawio.xml'}),
+                (memoryview(zip_path.read_bytes()), {'invalid.drawio.xml'}),
+                (tar_path, set()),
+                (BytesIO(tar_path.read_bytes()), set()),
+        ):
+            with self.subTest(source=source):
+                results = dict(ControlStructure.parse_archive(source))
+
+                for path in paths:
+                    self.assertEqual(
+                        results.pop(f'diagrams/{path.name}'),
+                        ControlStructure.parse_diagram(path),
+                    )
+
+                self.assertEqual(results.keys(), invalid_names)
+
+                for result in results.values():
+                    self.assertIsInstance(result, ET.ParseError)
+
+    def export_example(self, path: Path, suffix: str) -> Path:
+        model = path.read_bytes()
+        export_path = self.directory / path.name.replace('.xml', suffix)
+
+        match suffix:
+            case '.svg':
+                svg = ET.Element(
+                    'svg',
+                    xmlns='http://www.w3.org/2000/svg',
+                    content=model.decode(),
+                )
+
+                ET.SubElement(svg, 'rect', width='10', height='10')
+                ET.ElementTree(svg).write(export_path, xml_declaration=True)
+            case '.png' | '.z.png':
+                if suffix == '.png':
+                    chunks = [(b'tEXt', b'mxfile\0' + quote(model).encode())]
+                else:
+                    chunks = [(b'zTXt', b'mxfile\0\0' + compress(model))]
+
+                chunks = [
+                    (b'IHDR', pack('>IIBBBBB', 1, 1, 8, 0, 0, 0, 0)),
+                    (b'tEXt', b'Software\0draw.io'),
+                    (b'IDAT', compress(b'\0\0')),
+                    *chunks,
+                    (b'IEND', b''),
+                ]
+
+                with open(export_path, 'wb') as file:
+                    file.write(b'\x89PNG\r\n\x1a\n')
+
+                    for chunk_type, data in chunks:
+                        file.write(pack('>I', len(data)) + chunk_type + data)
+                        file.write(pack('>I', crc32(chunk_type + data)))
+
+        return export_path
+
+    def test_parse_diagram_exports(self) -> None:
+        for path in self.get_example_paths():
+            expected_control_structure = ControlStructure.parse_diagram(path)
+
+            for suffix in '.svg', '.png', '.z.png':
+                export_path = self.export_example(path, suffix)
+
+                with self.subTest(path=path.name, suffix=suffix):
+                    for streaming in False, True:
+                        self.assertEqual(
+                            ControlStructure.parse_diagram(
+                                export_path,
+                                streaming,
+                            ),
+                            expected_control_structure,
+                        )
+
+        for path in self.get_example_paths():
+            file = UnseekableBytesIO(path.read_bytes())
+
+            self.assertEqual(
+                ControlStructure.parse_diagram(file, True),
+                ControlStructure.parse_diagram(path),
+            )
+
+        for content in (
+                b'<svg xmlns="http://www.w3.org/2000/svg"/>',
+                b'\x89PNG\r\n\x1a\n\0\0\0\0IEND\xaeB`\x82',
+        ):
+            with self.assertRaises(ValueError):
+                ControlStructure.parse_diagram(content)
+
+    def test_parse_diagram_wrappers_and_containers(self) -> None:
+        path = self.directory / 'nested.drawio.xml'
+
+        path.write_text(
+            '<mxfile><diagram name="Page-1"><mxGraphModel><root>'
+            '<mxCell id="0"/>'
+            '<mxCell id="1" parent="0"/>'
+            '<mxCell id="vehicle" value="Vehicle" style="swimlane;"'
+            ' vertex="1" parent="1">'
+            '<mxGeometry x="0" y="0" width="400" height="400"'
+            ' as="geometry"/>'
+            '</mxCell>'
+            '<mxCell id="group" value="" style="group;" vertex="1"'
+            ' connectable="0" parent="vehicle">'
+            '<mxGeometry x="20" y="40" width="200" height="300"'
+            ' as="geometry"/>'
+            '</mxCell>'
+            '<UserObject id="controller" label="%kind% Controller"'
+            ' placeholders="1" kind="Brake">'
+            '<mxCell vertex="1" parent="group">'
+            '<mxGeometry x="0" y="0" width="120" height="60"'
+            ' as="geometry"/>'
+            '</mxCell>'
+            '</UserObject>'
+            '<object id="actuator" label="&lt;b&gt;Actuator&lt;/b&gt;"'
+            ' part="1">'
+            '<mxCell vertex="1" parent="group">'
+            '<mxGeometry x="0" y="200" width="120" height="60"'
+            ' as="geometry"/>'
+            '</mxCell>'
+            '</object>'
+            '<mxCell id="driver" value="Driver" vertex="1" parent="1">'
+            '<mxGeometry x="600" y="0" width="120" height="60"'
+            ' as="geometry"/>'
+            '</mxCell>'
+            '<object id="edge" label="" reviewed="1">'
+            '<mxCell edge="1" parent="group" source="controller"'
+            ' target="actuator">'
+            '<mxGeometry relative="1" as="geometry"/>'
+            '</mxCell>'
+            '</object>'
+            '<mxCell id="label" value="Apply" vertex="1" connectable="0"'
+            ' parent="edge">'
+            '<mxGeometry relative="1" as="geometry"/>'
+            '</mxCell>'
+            '<mxCell id="feedback" edge="1" parent="1" source="vehicle"'
+            ' target="driver" style="exitX=1;exitY=0.5;entryX=0;'
+            'entryY=0.5;">'
+            '<mxGeometry relative="1" as="geometry"/>'
+            '</mxCell>'
+            '</root></mxGraphModel></diagram></mxfile>',
+        )
+
+        vehicle = Entity('Vehicle')
+        controller = Entity('Brake Controller')
+        actuator = Entity('Actuator')
+        driver = Entity('Driver')
+        expected_control_structure = ControlStructure(
+            frozenset({vehicle, controller, actuator, driver}),
+            frozenset(
+                {
+                    ControlActionOrFeedback(
+                        'Apply',
+                        ControlType.ACTION,
+                        controller,
+                        actuator,
+                    ),
+                    ControlActionOrFeedback(
+                        '',
+                        ControlType.ACTION,
+                        vehicle,
+                        driver,
+                    ),
+                },
+            ),
+            frozenset({(controller, vehicle), (actuator, vehicle)}),
+        )
+
+        for backend in XMLBackend.get_available():
+            for streaming in False, True:
+                with self.subTest(backend=backend, streaming=streaming):
+                    self.assertEqual(
+                        ControlStructure.parse_diagram(
+                            path,
+                            streaming,
+                            backend=backend,
+                        ),
+                        expected_control_structure,
+                    )
+
+        compressed_path = self.compress_example(path)
+        cache = ControlStructureCache(self.directory / 'cache')
+
+        for _ in range(2):
+            self.assertEqual(
+                ControlStructure.parse_diagram(compressed_path, cache=cache),
+                expected_control_structure,
+            )
+
+        control_structure, _ = IncrementalParser().parse_diagram(path)
+
+        self.assertEqual(control_structure, expected_control_structure)
+        self.assertEqual(
+            control_structure.get_contained_entities(vehicle),
+            {controller, actuator},
+        )
+        self.assertEqual(control_structure.get_containers(actuator), {vehicle})
+        self.assertEqual(
+            control_structure.get_ancestry(controller),
+            (vehicle,),
+        )
+        self.assertEqual(control_structure.get_ancestry(vehicle), ())
+
+    def test_parse_diagram_across_containers(self) -> None:
+        def get_content(group_y: int) -> bytes:
+            return (
+                '<mxfile><diagram name="Page-1"><mxGraphModel><root>'
+                '<mxCell id="0"/>'
+                '<mxCell id="1" parent="0"/>'
+                '<mxCell id="controller" value="Controller" vertex="1"'
+                ' parent="1">'
+                '<mxGeometry x="300" y="0" width="120" height="60"'
+                ' as="geometry"/>'
+                '</mxCell>'
+                '<mxCell id="group" value="" style="group;" vertex="1"'
+                ' connectable="0" parent="1">'
+                f'<mxGeometry x="0" y="{group_y}" width="200" height="100"'
+                ' as="geometry"/>'
+                '</mxCell>'
+                '<mxCell id="process" value="Process" vertex="1"'
+                ' parent="group">'
+                '<mxGeometry x="0" y="10" width="120" height="60"'
+                ' as="geometry"/>'
+                '</mxCell>'
+                '<mxCell id="down" edge="1" parent="1" source="controller"'
+                ' target="process">'
+                '<mxGeometry relative="1" as="geometry"/>'
+                '</mxCell>'
+                '<mxCell id="up" edge="1" parent="1" source="process"'
+                ' target="controller">'
+                '<mxGeometry relative="1" as="geometry"/>'
+                '</mxCell>'
+                '</root></mxGraphModel></diagram></mxfile>'
+            ).encode()
+
+        def get_control_structure(
+                controller: Entity,
+                controlled: Entity,
+        ) -> ControlStructure:
+            return ControlStructure(
+                frozenset({controller, controlled}),
+                frozenset(
+                    ControlActionOrFeedback(
+                        '',
+                        control_type,
+                        controller,
+                        controlled,
+                    )
+                    for control_type in ControlType
+                ),
+            )
+
+        controller = Entity('Controller')
+        process = Entity('Process')
+        expected_control_structure = get_control_structure(
+            controller,
+            process,
+        )
+
+        for backend in XMLBackend.get_available():
+            for streaming in False, True:
+                with self.subTest(backend=backend, streaming=streaming):
+                    self.assertEqual(
+                        ControlStructure.parse_diagram(
+                            get_content(500),
+                            streaming,
+                            backend=backend,
+                        ),
+                        expected_control_structure,
+                    )
+
+        parser = IncrementalParser()
+        control_structure, _ = parser.parse_diagram(get_content(500))
+
+        self.assertEqual(control_structure, expected_control_structure)
+
+        # Moving the group above the controller turns the process into the
+        # controller of the edges.
+        control_structure, delta = parser.parse_diagram(get_content(-500))
+
+        self.assertEqual(
+            control_structure,
+            get_control_structure(process, controller),
+        )
+        self.assertEqual(
+            control_structure,
+            ControlStructure.parse_diagram(get_content(-500)),
+        )
+        self.assertEqual(len(delta.changed_control_actions_or_feedbacks), 2)
+
+    def test_parse_pages(self) -> None:
+        paths = self.get_example_paths()
+        mxfile = ET.Element('mxfile')
+
+        for index, path in enumerate(paths):
+            if index % 2:
+                path = self.compress_example(path)
+
+            diagram = ET.parse(path).getroot()[0]
+            diagram.attrib['name'] = path.name
+
+            mxfile.append(diagram)
+
+        pages_path = self.directory / 'pages.drawio.xml'
+
+        ET.ElementTree(mxfile).write(pages_path)
+
+        for max_workers in (1, 2):
+            with self.subTest(max_workers=max_workers):
+                control_structures = ControlStructure.parse_pages(
+                    pages_path,
+                    max_workers,
+                )
+
+                self.assertEqual(
+                    list(control_structures),
+                    [path.name for path in paths],
+                )
+
+                for path in paths:
+                    self.assertEqual(
+                        control_structures[path.name],
+                        ControlStructure.parse_diagram(path),
+                    )
+
+        mxfile.append(mxfile[0])
+        ET.ElementTree(mxfile).write(pages_path)
+
+        self.assertRaises(
+            ValueError,
+            ControlStructure.parse_pages,
+            pages_path,
+        )
+
+    def test_parse_diagrams(self) -> None:
+        paths = self.get_example_paths()
+        invalid_path = self.directory / 'invalid.drawio.xml'
+
+        invalid_path.write_text('<mxfile>')
+
+        for path in paths:
+            (self.directory / path.name).write_bytes(path.read_bytes())
+
+        for source, pattern, max_workers, chunk_size in (
+                (self.directory, '*.drawio.xml', 1, 1),
+                (self.directory, '**/*.drawio.xml', 2, 3),
+                (self.directory / '*.drawio.xml', '', None, 2),
+        ):
+            with self.subTest(source=source, max_workers=max_workers):
+                results = dict(
+                    ControlStructure.parse_diagrams(
+                        source,
+                        pattern,
+                        max_workers,
+                        chunk_size,
+                    ),
+                )
+
+                self.assertEqual(len(results), len(paths) + 1)
+                self.assertIsInstance(results[invalid_path], ET.ParseError)
+
+                for path in paths:
+                    self.assertEqual(
+                        results[self.directory / path.name],
+                        ControlStructure.parse_diagram(path),
+                    )
+
+    def test_parse_diagram_cache(self) -> None:
+        paths = self.get_example_paths()
+        cache = ControlStructureCache(self.directory / 'cache')
+        control_structures = {}
+
+        for path in paths:
+            control_structures[path] = ControlStructure.parse_diagram(
+                path,
+                cache=cache,
+            )
+
+            self.assertEqual(
+                control_structures[path],
+                ControlStructure.parse_diagram(path),
+            )
+
+        self.assertEqual(
+            len(list(cache.directory.glob(f'*{cache.SUFFIX}'))),
+            len(paths),
+        )
+
+        with patch.object(ControlStructure, '_parse_file') as parse_file:
+            for path in paths:
+                self.assertEqual(
+                    ControlStructure.parse_diagram(path, cache=cache),
+                    control_structures[path],
+                )
+
+            parse_file.assert_not_called()
+
+        cache.clear()
+
+        bypassed_cache = ControlStructureCache(cache.directory, bypass=True)
+
+        for path in paths:
+            self.assertEqual(
+                ControlStructure.parse_diagram(path, cache=bypassed_cache),
+                control_structures[path],
+            )
+
+        self.assertFalse(list(cache.directory.glob(f'*{cache.SUFFIX}')))
+
+        small_cache = ControlStructureCache(cache.directory, 1000)
+
+        for path in paths:
+            ControlStructure.parse_diagram(path, cache=small_cache)
+
+        sizes = [
+            path.stat().st_size
+            for path in cache.directory.glob(f'*{cache.SUFFIX}')
+        ]
+
+        self.assertTrue(sizes)
+        self.assertLessEqual(sum(sizes), small_cache.max_size)
+
+        small_cache.clear()
+
+        with patch.object(
+                ControlStructureCache,
+                'evict',
+                autospec=True,
+                side_effect=ControlStructureCache.evict,
+        ) as evict:
+            for path in paths:
+                ControlStructure.parse_diagram(path, cache=cache)
+
+            evict.assert_not_called()
+
+            cache.clear()
+
+            results = ControlStructure.parse_diagrams(
+                paths[0].parent,
+                '**/*.drawio.xml',
+                1,
+                cache=small_cache,
+            )
+
+            for path, result in results:
+                self.assertEqual(result, control_structures[path])
+
+            evict.assert_called_once_with(small_cache)
+
+        sizes = [
+            path.stat().st_size
+            for path in cache.directory.glob(f'*{cache.SUFFIX}')
+        ]
+
+        self.assertTrue(sizes)
+        self.assertLessEqual(sum(sizes), small_cache.max_size)
+
+    def test_incremental_parser(self) -> None:
+        path = self.get_figure_2_11_path()
+        parser = IncrementalParser()
+        control_structure, delta = parser.parse_diagram(path)
+
+        self.assertEqual(
+            control_structure,
+            ControlStructure.parse_diagram(path),
+        )
+        self.assertEqual(
+            delta,
+            ControlStructureDelta(
+                added_entities=control_structure.entities,
+                added_control_actions_or_feedbacks=(
+                    control_structure.control_actions_or_feedbacks
+                ),
+            ),
+        )
+
+        unchanged_control_structure, delta = parser.parse_diagram(path)
+
+        self.assertIs(unchanged_control_structure, control_structure)
+        self.assertFalse(delta)
+
+        tree = ET.parse(path)
+        cells = {cell.attrib['id']: cell for cell in tree.iter('mxCell')}
+        root = tree.getroot()[0][0][0]
+        cells['nAYwMQFtMR6DgSdDB1PP-2'].attrib['value'] = 'Other Subsystems'
+        geometry = cells['nAYwMQFtMR6DgSdDB1PP-4'].find('mxGeometry')
+
+        assert geometry is not None
+
+        geometry.attrib['y'] = '10'
+
+        root.remove(cells['nAYwMQFtMR6DgSdDB1PP-24'])
+        root.remove(cells['nAYwMQFtMR6DgSdDB1PP-14'])
+
+        edited_path = self.directory / path.name
+
+        tree.write(edited_path)
+
+        edited_control_structure, delta = parser.parse_diagram(edited_path)
+
+        self.assertEqual(
+            edited_control_structure,
+            ControlStructure.parse_diagram(edited_path),
+        )
+        self.assertEqual(
+            delta.changed_entities,
+            {(Entity('Other subsystems'), Entity('Other Subsystems'))},
+        )
+        self.assertFalse(delta.added_entities)
+        self.assertFalse(delta.removed_entities)
+        self.assertFalse(delta.added_control_actions_or_feedbacks)
+        self.assertEqual(
+            delta.removed_control_actions_or_feedbacks,
+            control_structure.control_actions_or_feedbacks
+            - edited_control_structure.control_actions_or_feedbacks
+            - {
+                previous_control_action_or_feedback
+                for previous_control_action_or_feedback, _
+                in delta.changed_control_actions_or_feedbacks
+            },
+        )
+        self.assertEqual(len(delta.removed_control_actions_or_feedbacks), 1)
+        self.assertEqual(len(delta.changed_control_actions_or_feedbacks), 3)
+
+        for previous, current in delta.changed_control_actions_or_feedbacks:
+            self.assertIsInstance(previous, ControlActionOrFeedback)
+            self.assertIn(
+                current,
+                edited_control_structure.control_actions_or_feedbacks,
+            )
+
+    def test_diff(self) -> None:
+        control_structure = ControlStructure.parse_diagram(
+            self.get_figure_2_11_path(),
+        )
+        action = next(
+            control_action_or_feedback
+            for control_action_or_feedback
+            in control_structure.control_actions_or_feedbacks
+            if control_action_or_feedback.control_type == ControlType.ACTION
+        )
+        feedback = next(
+            control_action_or_feedback
+            for control_action_or_feedback
+            in control_structure.control_actions_or_feedbacks
+            if control_action_or_feedback.control_type == ControlType.FEEDBACK
+        )
+        entity = Entity('New Controller')
+        flipped_action = ControlActionOrFeedback(
+            action.description,
+            ControlType.FEEDBACK,
+            action.controlled,
+            action.controller,
+        )
+        rerouted_feedback = ControlActionOrFeedback(
+            feedback.description,
+            feedback.control_type,
+            entity,
+            feedback.controlled,
+        )
+        added = ControlActionOrFeedback(
+            'New action',
+            ControlType.ACTION,
+            entity,
+            action.controller,
+        )
+        other_control_structure = ControlStructure(
+            control_structure.entities | {entity},
+            control_structure.control_actions_or_feedbacks
+            - {action, feedback}
+            | {flipped_action, rerouted_feedback, added},
+        )
+
+        self.assertFalse(control_structure.diff(control_structure))
+
+        delta = control_structure.diff(other_control_structure)
+
+        self.assertEqual(
+            delta,
+            ControlStructureDelta(
+                added_entities=frozenset({entity}),
+                added_control_actions_or_feedbacks=frozenset({added}),
+                rerouted_control_actions_or_feedbacks=frozenset(
+                    {(feedback, rerouted_feedback)},
+                ),
+                flipped_control_actions_or_feedbacks=frozenset(
+                    {(action, flipped_action)},
+                ),
+            ),
+        )
+        self.assertEqual(delta.to_dict()['added_entities'], [entity.name])
+        self.assertEqual(
+            delta.to_dict()['flipped_control_actions_or_feedbacks'][0][
+                'next'
+            ]['control_type'],
+            'FEEDBACK',
+        )
+        self.assertIn('Added entities (1):\n  New Controller', str(delta))
+        self.assertIn('Flipped control actions or feedbacks (1):', str(delta))
+
+        reverse_delta = other_control_structure.diff(control_structure)
+
+        self.assertEqual(
+            reverse_delta.removed_control_actions_or_feedbacks,
+            {added},
+        )
+        self.assertEqual(
+            reverse_delta.flipped_control_actions_or_feedbacks,
+            {(flipped_action, action)},
+        )
+
+    def test_diff_ambiguous(self) -> None:
+        a, b, c, d, e = map(Entity, 'ABCDE')
+        previous_items = {
+            ControlActionOrFeedback('', ControlType.ACTION, a, b),
+            ControlActionOrFeedback('', ControlType.ACTION, a, c),
+        }
+        next_items = {
+            ControlActionOrFeedback('', ControlType.ACTION, a, d),
+            ControlActionOrFeedback('', ControlType.ACTION, a, e),
+        }
+        command = ControlActionOrFeedback('Command', ControlType.ACTION, a, b)
+        rerouted_command = ControlActionOrFeedback(
+            'Command',
+            ControlType.ACTION,
+            a,
+            d,
+        )
+        control_structure = ControlStructure(
+            frozenset({a, b, c}),
+            frozenset(previous_items | {command}),
+        )
+        other_control_structure = ControlStructure(
+            frozenset({a, d, e}),
+            frozenset(next_items | {rerouted_command}),
+        )
+        delta = control_structure.diff(other_control_structure)
+
+        # The unlabelled edges of A share their key, so pairing them would be
+        # arbitrary.
+        self.assertEqual(
+            delta.rerouted_control_actions_or_feedbacks,
+            {(command, rerouted_command)},
+        )
+        self.assertEqual(
+            delta.removed_control_actions_or_feedbacks,
+            previous_items,
+        )
+        self.assertEqual(delta.added_control_actions_or_feedbacks, next_items)
+
+    def test_federated_control_structure(self) -> None:
+        controller = Entity('Controller')
+        process = Entity('Controlled Process')
+        sensor = Entity('Sensor')
+        action = ControlActionOrFeedback(
+            'Command',
+            ControlType.ACTION,
+            controller,
+            process,
+        )
+        feedback = ControlActionOrFeedback(
+            'Measurement',
+            ControlType.FEEDBACK,
+            controller,
+            sensor,
+        )
+        flipped_action = ControlActionOrFeedback(
+            'Command',
+            ControlType.FEEDBACK,
+            process,
+            controller,
+        )
+        first_control_structure = ControlStructure(
+            frozenset({controller, process}),
+            frozenset({action}),
+        )
+        second_control_structure = ControlStructure(
+            frozenset({controller, sensor}),
+            frozenset({feedback}),
+            frozenset({(sensor, controller)}),
+        )
+        federated_control_structure = FederatedControlStructure.merge(
+            {'first': first_control_structure},
+        )
+        delta = federated_control_structure.update(
+            'second',
+            second_control_structure,
+        )
+
+        self.assertEqual(
+            delta,
+            ControlStructureDelta(
+                added_entities=frozenset({sensor}),
+                added_control_actions_or_feedbacks=frozenset({feedback}),
+            ),
+        )
+        self.assertEqual(
+            federated_control_structure.control_structure,
+            ControlStructure(
+                frozenset({controller, process, sensor}),
+                frozenset({action, feedback}),
+                frozenset({(sensor, controller)}),
+            ),
+        )
+        self.assertEqual(
+            federated_control_structure.sources,
+            {'first', 'second'},
+        )
+        self.assertEqual(
+            federated_control_structure.get_sources(controller),
+            {'first', 'second'},
+        )
+        self.assertEqual(
+            federated_control_structure.get_sources(feedback),
+            {'second'},
+        )
+        self.assertEqual(
+            federated_control_structure.get_sources((sensor, controller)),
+            {'second'},
+        )
+        self.assertIs(
+            federated_control_structure.get_entity('Sensor'),
+            sensor,
+        )
+        self.assertIsNone(federated_control_structure.get_entity('Plant'))
+        self.assertFalse(federated_control_structure.conflicts)
+
+        delta = federated_control_structure.update(
+            'second',
+            ControlStructure(
+                frozenset({controller, process, Entity('sensor ')}),
+                frozenset({flipped_action}),
+            ),
+        )
+
+        self.assertEqual(delta.removed_entities, {sensor})
+        self.assertEqual(delta.added_entities, {Entity('sensor ')})
+        self.assertEqual(
+            delta.removed_control_actions_or_feedbacks,
+            {feedback},
+        )
+        self.assertCountEqual(
+            federated_control_structure.conflicts,
+            [
+                MergeConflict(
+                    ConflictType.CONTROL_TYPE,
+                    control_actions_or_feedbacks=frozenset(
+                        {action, flipped_action},
+                    ),
+                    sources=frozenset({'first', 'second'}),
+                ),
+            ],
+        )
+
+        federated_control_structure.update(
+            'third',
+            second_control_structure,
+        )
+
+        federated_control_structure.update(
+            'fourth',
+            ControlStructure(
+                frozenset({Entity('controlled process')}),
+                frozenset(),
+            ),
+        )
+
+        # Conflicts are listed by type and then by name, whatever the hash
+        # order of their keys.
+        self.assertEqual(
+            federated_control_structure.conflicts,
+            [
+                MergeConflict(
+                    ConflictType.NAME,
+                    entities=frozenset(
+                        {process, Entity('controlled process')},
+                    ),
+                    sources=frozenset({'first', 'second', 'fourth'}),
+                ),
+                MergeConflict(
+                    ConflictType.NAME,
+                    entities=frozenset({sensor, Entity('sensor ')}),
+                    sources=frozenset({'second', 'third'}),
+                ),
+                MergeConflict(
+                    ConflictType.CONTROL_TYPE,
+                    control_actions_or_feedbacks=frozenset(
+                        {action, flipped_action},
+                    ),
+                    sources=frozenset({'first', 'second'}),
+                ),
+            ],
+        )
+
+        federated_control_structure.remove('fourth')
+
+        delta = federated_control_structure.remove('second')
+
+        self.assertEqual(
+            delta,
+            ControlStructureDelta(
+                removed_entities=frozenset({Entity('sensor ')}),
+                removed_control_actions_or_feedbacks=frozenset(
+                    {flipped_action},
+                ),
+            ),
+        )
+        self.assertFalse(federated_control_structure.conflicts)
+        self.assertEqual(
+            federated_control_structure.get_sources(process),
+            {'first'},
+        )
+        self.assertEqual(
+            federated_control_structure.control_structure,
+            ControlStructure(
+                frozenset({controller, process, sensor}),
+                frozenset({action, feedback}),
+                frozenset({(sensor, controller)}),
+            ),
+        )
+
+        control_structures = {
+            path: ControlStructure.parse_diagram(path)
+            for path in self.get_example_paths()
+        }
+        federated_control_structure = FederatedControlStructure.merge(
+            control_structures,
+        )
+
+        self.assertEqual(
+            federated_control_structure.control_structure.entities,
+            frozenset().union(
+                *(
+                    control_structure.entities
+                    for control_structure in control_structures.values()
+                ),
+            ),
+        )
+
+        for path in control_structures:
+            federated_control_structure.remove(path)
+
+        self.assertFalse(
+            federated_control_structure.control_structure.entities,
+        )
+
+    def test_write_diagram(self) -> None:
+        for path in self.get_example_paths():
+            control_structure = ControlStructure.parse_diagram(path)
+
+            for compressed in False, True:
+                written_path = self.directory / path.name
+
+                control_structure.write_diagram(written_path, compressed)
+
+                for streaming in False, True:
+                    self.assertEqual(
+                        ControlStructure.parse_diagram(
+                            written_path,
+                            streaming,
+                        ),
+                        control_structure,
+                    )
+
+        controller = Entity('Controller & <Co>')
+        controlled = Entity('Controlled "process"')
+        control_structure = ControlStructure(
+            frozenset({controller, controlled}),
+            frozenset(
+                {
+                    ControlActionOrFeedback(
+                        'Set <point> & "rate"',
+                        ControlType.ACTION,
+                        controller,
+                        controlled,
+                    ),
+                    ControlActionOrFeedback(
+                        '',
+                        ControlType.FEEDBACK,
+                        controller,
+                        controlled,
+                    ),
+                    ControlActionOrFeedback(
+                        'Reset',
+                        ControlType.ACTION,
+                        controller,
+                        controller,
+                    ),
+                },
+            ),
+        )
+        written_path = self.directory / 'written.drawio.xml'
+
+        control_structure.write_diagram(written_path, True, 'Control')
+
+        self.assertEqual(
+            ControlStructure.parse_pages(written_path),
+            {'Control': control_structure},
+        )
+
+    def test_layout(self) -> None:
+        a, b, y, z = map(Entity, 'ABYZ')
+        control_structure = ControlStructure(
+            frozenset({a, b, y, z}),
+            frozenset(
+                {
+                    ControlActionOrFeedback('', ControlType.ACTION, a, z),
+                    ControlActionOrFeedback('', ControlType.ACTION, b, y),
+                    ControlActionOrFeedback('', ControlType.FEEDBACK, a, z),
+                },
+            ),
+        )
+        layout = control_structure.layout
+
+        self.assertLess(layout[a][1], layout[z][1])
+        self.assertEqual(layout[a][1], layout[b][1])
+        self.assertEqual(layout[y][1], layout[z][1])
+        self.assertLess(layout[a][0], layout[b][0])
+        self.assertLess(layout[z][0], layout[y][0])
+
+        for path in self.get_example_paths():
+            control_structure = ControlStructure.parse_diagram(path)
+            layout = control_structure.layout
+            levels = control_structure.hierarchy_levels
+
+            self.assertEqual(layout.keys(), levels.keys())
+
+            for control_action_or_feedback in (
+                    control_structure.control_actions_or_feedbacks
+            ):
+                controller = control_action_or_feedback.controller
+                controlled = control_action_or_feedback.controlled
+
+                if levels[controller] < levels[controlled]:
+                    match control_action_or_feedback.control_type:
+                        case ControlType.ACTION:
+                            source, target = controller, controlled
+                        case ControlType.FEEDBACK:
+                            source, target = controlled, controller
+
+                    self.assertEqual(
+                        ControlStructure._get_control_type(
+                            layout[source],
+                            layout[target],
+                        ),
+                        control_action_or_feedback.control_type,
+                    )
+
+    def test_neighbor_queries(self) -> None:
+        control_structure = ControlStructure.parse_diagram(
+            self.get_figure_2_11_path(),
+        )
+        flight_crew = Entity('Flight Crew')
+        physical_wheel_brakes = Entity('Physical Wheel Brakes')
+        brake_system_control_unit = Entity('Brake System Control Unit(BSCU)')
+
+        self.assertEqual(
+            {
+                action.description
+                for action
+                in control_structure.get_actions_by_controller(flight_crew)
+            },
+            {
+                'Manual controls(Engine throttle,Steer, Reverse thrust,etc.)',
+                'Arm and Set,Disarm,Brake',
+                'ManualBraking',
+            },
+        )
+        self.assertEqual(
+            {
+                action.controller
+                for action in control_structure.get_actions_by_controlled(
+                    physical_wheel_brakes,
+                )
+            },
+            {flight_crew, brake_system_control_unit},
+        )
+        self.assertEqual(
+            len(control_structure.get_feedbacks_by_controller(flight_crew)),
+            3,
+        )
+        self.assertEqual(
+            {
+                feedback.controller
+                for feedback in control_structure.get_feedbacks_by_controlled(
+                    physical_wheel_brakes,
+                )
+            },
+            {flight_crew, brake_system_control_unit},
+        )
+        self.assertEqual(
+            control_structure.get_by_description('Brake'),
+            {
+                ControlActionOrFeedback(
+                    'Brake',
+                    ControlType.ACTION,
+                    brake_system_control_unit,
+                    physical_wheel_brakes,
+                ),
+            },
+        )
+        self.assertEqual(len(control_structure.get_by_description('')), 4)
+        self.assertFalse(
+            control_structure.get_actions_by_controller(physical_wheel_brakes),
+        )
+        self.assertFalse(control_structure.get_by_description('Unknown'))
+
+    def test_control_loops_and_hierarchy_levels(self) -> None:
+        control_structure = ControlStructure.parse_diagram(
+            self.get_figure_2_11_path(),
+        )
+        flight_crew = Entity('Flight Crew')
+        other_subsystems = Entity('Other subsystems')
+        brake_system_control_unit = Entity('Brake System Control Unit(BSCU)')
+        physical_wheel_brakes = Entity('Physical Wheel Brakes')
+
+        self.assertEqual(
+            [
+                (control_loop.controller, control_loop.controlled)
+                for control_loop in control_structure.control_loops
+            ],
+            [
+                (brake_system_control_unit, physical_wheel_brakes),
+                (flight_crew, brake_system_control_unit),
+                (flight_crew, other_subsystems),
+                (flight_crew, physical_wheel_brakes),
+            ],
+        )
+        self.assertEqual(
+            [
+                sorted(entity.name for entity in component)
+                for component
+                in control_structure.strongly_connected_components
+            ],
+            [
+                ['Aircraft'],
+                [
+                    'Brake System Control Unit(BSCU)',
+                    'Flight Crew',
+                    'Other subsystems',
+                    'Physical Wheel Brakes',
+                ],
+                ['Wheel Braking Subsytem (WBS)'],
+            ],
+        )
+        self.assertEqual(
+            control_structure.hierarchy_levels,
+            {
+                flight_crew: 0,
+                other_subsystems: 1,
+                brake_system_control_unit: 1,
+                physical_wheel_brakes: 2,
+                Entity('Aircraft'): 0,
+                Entity('Wheel Braking Subsytem (WBS)'): 0,
+            },
+        )
+        self.assertIs(
+            control_structure.control_loops,
+            control_structure.control_loops,
+        )
+
+    def test_control_loops_and_hierarchy_levels_large(self) -> None:
+        entities = [Entity(f'Entity {index}') for index in range(20000)]
+        control_actions_or_feedbacks = set()
+
+        for controller, controlled in zip(entities, entities[1:]):
+            for control_type in ControlType:
+                control_actions_or_feedbacks.add(
+                    ControlActionOrFeedback(
+                        '',
+                        control_type,
+                        controller,
+                        controlled,
+                    ),
+                )
+
+        control_structure = ControlStructure(
+            frozenset(entities),
+            frozenset(control_actions_or_feedbacks),
+        )
+
+        self.assertEqual(
+            control_structure.strongly_connected_components,
+            (frozenset(entities),),
+        )
+        self.assertEqual(len(control_structure.control_loops), 19999)
+        self.assertIsInstance(control_structure.control_loops[0], ControlLoop)
+        self.assertEqual(
+            control_structure.hierarchy_levels,
+            {entity: index for index, entity in enumerate(entities)},
+        )
+
+    def test_path_queries(self) -> None:
+        operator, controller, actuator, process, sensor = map(
+            Entity,
+            ('Operator', 'Controller', 'Actuator', 'Process', 'Sensor'),
+        )
+        command = ControlActionOrFeedback(
+            'Command',
+            ControlType.ACTION,
+            operator,
+            controller,
+        )
+        override = ControlActionOrFeedback(
+            'Override',
+            ControlType.ACTION,
+            operator,
+            actuator,
+        )
+        signal = ControlActionOrFeedback(
+            'Signal',
+            ControlType.ACTION,
+            controller,
+            actuator,
+        )
+        force = ControlActionOrFeedback(
+            'Force',
+            ControlType.ACTION,
+            actuator,
+            process,
+        )
+        measurement = ControlActionOrFeedback(
+            'Measurement',
+            ControlType.FEEDBACK,
+            sensor,
+            process,
+        )
+        reading = ControlActionOrFeedback(
+            'Reading',
+            ControlType.FEEDBACK,
+            controller,
+            sensor,
+        )
+        display = ControlActionOrFeedback(
+            'Display',
+            ControlType.FEEDBACK,
+            operator,
+            controller,
+        )
+        control_structure = ControlStructure(
+            frozenset({operator, controller, actuator, process, sensor}),
+            frozenset(
+                {command, override, signal, force, measurement, reading,
+                 display},
+            ),
+        )
+
+        self.assertEqual(
+            control_structure.get_shortest_path(operator, process),
+            (override, force),
+        )
+        self.assertEqual(
+            control_structure.get_shortest_path(
+                process,
+                operator,
+                (ControlType.FEEDBACK,),
+            ),
+            (measurement, reading, display),
+        )
+        self.assertIsNone(
+            control_structure.get_shortest_path(
+                process,
+                operator,
+                (ControlType.ACTION,),
+            ),
+        )
+        self.assertEqual(
+            control_structure.get_shortest_path(operator, operator),
+            (),
+        )
+        self.assertCountEqual(
+            control_structure.iter_simple_paths(operator, process),
+            [(override, force), (command, signal, force)],
+        )
+        self.assertEqual(
+            list(control_structure.iter_simple_paths(operator, process, 2)),
+            [(override, force)],
+        )
+        self.assertEqual(
+            list(control_structure.iter_simple_paths(operator, process, 1)),
+            [],
+        )
+        self.assertEqual(
+            list(control_structure.iter_shortest_paths(operator, process)),
+            [(override, force), (command, signal, force)],
+        )
+        self.assertEqual(
+            list(
+                control_structure.iter_shortest_paths(
+                    process,
+                    actuator,
+                ),
+            ),
+            [
+                (measurement, reading, signal),
+                (measurement, reading, display, override),
+            ],
+        )
+
+        random = Random(0)
+        entities = [Entity(f'Entity {index}') for index in range(8)]
+        control_actions_or_feedbacks = {
+            ControlActionOrFeedback(
+                str(random.randrange(2)),
+                random.choice(list(ControlType)),
+                random.choice(entities),
+                random.choice(entities),
+            )
+            for _ in range(30)
+        }
+        control_structure = ControlStructure(
+            frozenset(entities),
+            frozenset(control_actions_or_feedbacks),
+        )
+
+        for source in entities:
+            for target in entities:
+                simple_paths = list(
+                    control_structure.iter_simple_paths(source, target),
+                )
+                shortest_paths = list(
+                    control_structure.iter_shortest_paths(source, target),
+                )
+
+                self.assertEqual(len(set(simple_paths)), len(simple_paths))
+                self.assertCountEqual(shortest_paths, simple_paths)
+                self.assertEqual(
+                    list(map(len, shortest_paths)),
+                    sorted(map(len, simple_paths)),
+                )
+
+                if simple_paths:
+                    self.assertEqual(
+                        len(
+                            control_structure.get_shortest_path(
+                                source,
+                                target,
+                            ) or (),
+                        ),
+                        len(shortest_paths[0]),
+                    )
+                else:
+                    self.assertIsNone(
+                        control_structure.get_shortest_path(source, target),
+                    )
+
+    def test_path_queries_large(self) -> None:
+        entities = [Entity(f'Entity {index}') for index in range(20000)]
+        control_actions_or_feedbacks = set()
+
+        for controller, controlled in zip(entities, entities[1:]):
+            for description in ('A', 'B'):
+                control_actions_or_feedbacks.add(
+                    ControlActionOrFeedback(
+                        description,
+                        ControlType.ACTION,
+                        controller,
+                        controlled,
+                    ),
+                )
+
+        control_structure = ControlStructure(
+            frozenset(entities),
+            frozenset(control_actions_or_feedbacks),
+        )
+        path = control_structure.get_shortest_path(entities[0], entities[-1])
+
+        self.assertIsNotNone(path)
+        self.assertEqual(len(path or ()), 19999)
+        self.assertEqual(
+            len(
+                next(
+                    control_structure.iter_simple_paths(
+                        entities[0],
+                        entities[-1],
+                    ),
+                ),
+            ),
+            19999,
+        )
+        self.assertEqual(
+            list(
+                control_structure.iter_simple_paths(
+                    entities[0],
+                    entities[-1],
+                    19998,
+                ),
+            ),
+            [],
+        )
+        self.assertEqual(
+            len(
+                list(
+                    islice(
+                        control_structure.iter_shortest_paths(
+                            entities[0],
+                            entities[100],
+                        ),
+                        10,
+                    ),
+                ),
+            ),
+            10,
+        )
+
+    def test_entity_hash_consing(self) -> None:
+        name = ''.join(['Flight', ' ', 'Crew'])
+        entity = Entity(name)
+
+        self.assertIs(Entity('Flight Crew'), entity)
+        self.assertIs(entity.name, Entity('Flight Crew').name)
+        self.assertIs(loads(dumps(entity)), entity)
+        self.assertIs(deepcopy(entity), entity)
+        self.assertEqual(hash(entity), hash(('Flight Crew',)))
+        self.assertFalse(hasattr(entity, '__dict__'))
+
+        first_control_structure = ControlStructure.parse_diagram(
+            self.get_figure_2_11_path(),
+        )
+        second_control_structure = ControlStructure.parse_diagram(
+            self.get_figure_2_11_path(),
+        )
+
+        for entity in first_control_structure.entities:
+            self.assertIs(Entity(entity.name), entity)
+            self.assertIn(entity, second_control_structure.entities)
+
+        control_action_or_feedback = next(
+            iter(first_control_structure.control_actions_or_feedbacks),
+        )
+
+        self.assertFalse(hasattr(control_action_or_feedback, '__dict__'))
+
+    def test_get_control_types(self) -> None:
+        random = Random(0)
+        geometries = [
+            (
+                random.randrange(0, 400, 20),
+                random.randrange(0, 400, 20),
+                random.randrange(20, 200, 20),
+                random.randrange(20, 200, 20),
+            )
+            for _ in range(50)
+        ]
+        sources = [random.randrange(len(geometries)) for _ in range(2000)]
+        targets = [random.randrange(len(geometries)) for _ in range(2000)]
+        routes = [
+            (
+                *random.choices((nan, 0, 0.25, 1), k=4),
+                *random.choices((nan, *range(0, 600, 20)), k=4),
+            )
+            for _ in range(2000)
+        ]
+        control_types = ControlStructure._get_control_types(
+            geometries,
+            sources,
+            targets,
+            routes,
+        )
+
+        with patch('stpa.control_structures.np', None):
+            self.assertEqual(
+                ControlStructure._get_control_types(
+                    geometries,
+                    sources,
+                    targets,
+                    routes,
+                ),
+                control_types,
+            )
+
+        self.assertEqual(
+            ControlStructure._get_control_types([], [], [], []),
+            [],
+        )
+
+    def test_get_control_type(self) -> None:
+        controller = ET.fromstring(
+            '<mxCell><mxGeometry x="0" y="100" width="100" height="40" />'
+            '</mxCell>',
+        )
+        controlled = ET.fromstring(
+            '<mxCell><mxGeometry x="200" width="100" height="300" />'
+            '</mxCell>',
+        )
+        upward_edge = ET.fromstring(
+            '<mxCell style="exitX=0.5;exitY=0;entryX=0.5;entryY=1;" />',
+        )
+
+        self.assertEqual(
+            ControlStructure.get_control_type(controller, controlled),
+            ControlType.ACTION,
+        )
+        self.assertEqual(
+            ControlStructure.get_control_type(controlled, controller),
+            ControlType.FEEDBACK,
+        )
+        self.assertEqual(
+            ControlStructure.get_control_type(
+                controller,
+                controlled,
+                upward_edge,
+            ),
+            ControlType.FEEDBACK,
+        )
+
+    def test_parse_diagram_route_hints(self) -> None:
+        examples = import_module('stpa.examples')
+        pathname = examples.__file__
+
+        assert isinstance(pathname, str)
+
+        path = (
+            Path(pathname).parent
+            / 'stpa_handbook'
+            / 'appendix_b'
+            / 'figure-B.7.drawio.xml'
+        )
+        control_structure = ControlStructure.parse_diagram(path)
+
+        self.assertIn(
+            ControlActionOrFeedback(
+                'Driverpresence,Inclination',
+                ControlType.FEEDBACK,
+                Entity('Auto-Hold Module'),
+                Entity('Physical Vehicle'),
+            ),
+            control_structure.control_actions_or_feedbacks,
+        )
@@ -0,0 +1,486 @@
+from asyncio import gather, run, sleep
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from importlib import import_module, reload
+from unittest import TestCase
+from warnings import catch_warnings, simplefilter
+
+from stpa.definitions import (
+    Definition,
+    Diagnostic,
+    DiagnosticType,
+    Hazard,
+    Loss,
+    Reference,
+    Registry,
+    ScenarioType1,
+    SubHazard,
+    SystemLevelConstraintType1,
+    UnsafeControlAction,
+)
+
+
+class RegistryTestCase(TestCase):
+    def test_activate(self) -> None:
+        outer_registry = Registry()
+        inner_registry = Registry()
+
+        with outer_registry.activate() as registry:
+            self.assertIs(registry, outer_registry)
+            self.assertIs(Registry.get_current(), outer_registry)
+
+            loss = Loss('L-1', 'Loss of life or injury to people')
+
+            with inner_registry.activate():
+                self.assertIs(Registry.get_current(), inner_registry)
+                self.assertNotIn('L-1', inner_registry)
+
+                other_loss = Loss('L-1', 'Loss of or damage to vehicle')
+
+                self.assertIs(Definition.get('L-1'), other_loss)
+
+            self.assertIs(Registry.get_current(), outer_registry)
+            self.assertIs(Definition.get('L-1'), loss)
+            self.assertEqual(
+                Definition.get_all('L-1', 'L-1'),
+                [loss, loss],
+            )
+
+            Definition.clear()
+
+            self.assertFalse(outer_registry)
+            self.assertEqual(len(inner_registry), 1)
+
+        self.assertIsNot(Registry.get_current(), outer_registry)
+
+    def test_duplicate(self) -> None:
+        with Registry().activate():
+            Loss('L-1', 'Loss of life or injury to people')
+
+            with self.assertWarnsRegex(UserWarning, 'already defined'):
+                Loss('L-1', 'Loss of or damage to vehicle')
+
+    def test_get_referrers(self) -> None:
+        with Registry().activate() as registry:
+            loss = Loss('L-1', 'Loss of life or injury to people')
+            hazard = Hazard(
+                'H-1',
+                'Aircraft',
+                'violate minimum separation standards',
+                [loss],
+            )
+            sub_hazard = SubHazard('H-1.1', hazard, 'Deceleration is low')
+            constraint = SystemLevelConstraintType1(
+                'SC-1',
+                'Aircraft',
+                'must satisfy minimum separation standards',
+                [hazard, hazard],
+            )
+            unsafe_control_actions = [
+                UnsafeControlAction(
+                    f'UCA-{index}',
+                    'BSCU',
+                    'does not provide',
+                    'Brake',
+                    'when the aircraft lands',
+                    [hazard if index % 2 else sub_hazard],
+                )
+                for index in range(1, 11)
+            ]
+
+            self.assertEqual(registry.get_referrers('L-1'), [hazard])
+            self.assertEqual(
+                registry.get_referrers('H-1'),
+                [sub_hazard, constraint, *unsafe_control_actions[::2]],
+            )
+            self.assertEqual(
+                registry.get_referrers('H-1', UnsafeControlAction),
+                unsafe_control_actions[::2],
+            )
+            self.assertEqual(
+                hazard.get_referrers(UnsafeControlAction),
+                unsafe_control_actions[::2],
+            )
+            self.assertEqual(
+                sub_hazard.get_referrers(),
+                unsafe_control_actions[1::2],
+            )
+            self.assertEqual(
+                registry.get_referrers_by_type('H-1'),
+                {
+                    SubHazard: [sub_hazard],
+                    SystemLevelConstraintType1: [constraint],
+                    UnsafeControlAction: unsafe_control_actions[::2],
+                },
+            )
+            self.assertEqual(registry.get_referrers('UCA-1'), [])
+
+            with self.assertWarns(UserWarning):
+                other_hazard = Hazard(
+                    'H-1',
+                    'Aircraft',
+                    'comes too close to other objects',
+                    [],
+                )
+
+            self.assertEqual(registry.get_referrers('L-1'), [])
+            self.assertEqual(len(other_hazard.get_referrers()), 7)
+
+            registry.clear()
+
+            self.assertEqual(registry.get_referrers('H-1'), [])
+
+    def test_get_referrers_outside_registry(self) -> None:
+        with Registry().activate():
+            loss = Loss('L-1', 'Loss of life or injury to people')
+            hazard = Hazard(
+                'H-1',
+                'Aircraft',
+                'violate minimum separation standards',
+                [loss],
+            )
+
+        with Registry().activate():
+            Hazard('H-1', 'Aircraft', 'airframe integrity is lost', [])
+
+            self.assertEqual(loss.get_referrers(), [hazard])
+            self.assertEqual(loss.get_referrers(Hazard), [hazard])
+
+        self.assertEqual(loss.get_referrers(), [hazard])
+
+    def test_get_upstream_and_downstream(self) -> None:
+        with Registry().activate() as registry:
+            losses = [
+                Loss(f'L-{index}', f'Loss {index}') for index in range(1, 4)
+            ]
+            hazard = Hazard(
+                'H-1',
+                'Aircraft',
+                'violate minimum separation standards',
+                losses[:2],
+            )
+            sub_hazard = SubHazard('H-1.1', hazard, 'Deceleration is low')
+            unsafe_control_action = UnsafeControlAction(
+                'UCA-1',
+                'BSCU',
+                'does not provide',
+                'Brake',
+                'when the aircraft lands',
+                [sub_hazard],
+            )
+            scenario = ScenarioType1(
+                'Scenario 1 for UCA-1',
+                'The BSCU fails',
+                unsafe_control_action,
+            )
+
+            self.assertEqual(
+                registry.get_upstream('Scenario 1 for UCA-1'),
+                [*losses[:2], hazard, sub_hazard, unsafe_control_action],
+            )
+            self.assertEqual(
+                registry.get_upstream('Scenario 1 for UCA-1', Loss),
+                losses[:2],
+            )
+            self.assertEqual(
+                registry.get_downstream('L-2'),
+                [hazard, sub_hazard, unsafe_control_action, scenario],
+            )
+            self.assertEqual(
+                registry.get_downstream('L-1', UnsafeControlAction),
+                [unsafe_control_action],
+            )
+            self.assertEqual(registry.get_downstream('L-3'), [])
+            self.assertEqual(registry.get_downstream('L-4'), [])
+
+            with self.assertWarns(UserWarning):
+                other_hazard = Hazard(
+                    'H-1',
+                    'Aircraft',
+                    'comes too close to other objects',
+                    losses[2:],
+                )
+
+            self.assertEqual(
+                registry.get_downstream('L-3'),
+                [other_hazard, sub_hazard, unsafe_control_action, scenario],
+            )
+            self.assertEqual(registry.get_downstream('L-1'), [])
+
+    def test_get_upstream_and_downstream_examples(self) -> None:
+        def get_upstream(definition: Definition) -> set[str]:
+            upstream = set()
+
+            for value in vars(definition).values():
+                for reference in (
+                        value if isinstance(value, list) else [value]
+                ):
+                    if isinstance(reference, Definition):
+                        upstream.add(reference.name)
+                        upstream |= get_upstream(reference)
+
+            return upstream
+
+        with Registry().activate() as registry, catch_warnings():
+            simplefilter('ignore')
+            reload(
+                import_module(
+                    'stpa.examples.stpa_handbook.chapter_2.definitions',
+                ),
+            )
+
+            self.assertTrue(registry)
+
+            for name, definition in registry.definitions.items():
+                self.assertEqual(
+                    {
+                        upstream_definition.name
+                        for upstream_definition
+                        in registry.get_upstream(name)
+                    },
+                    get_upstream(definition),
+                )
+                self.assertEqual(
+                    {
+                        downstream_definition.name
+                        for downstream_definition
+                        in registry.get_downstream(name)
+                    },
+                    {
+                        other_name
+                        for other_name, other_definition
+                        in registry.definitions.items()
+                        if name in get_upstream(other_definition)
+                    },
+                )
+
+    def test_lazy_references(self) -> None:
+        with Registry().activate() as registry:
+            unsafe_control_action = UnsafeControlAction(
+                'UCA-1',
+                'BSCU',
+                'does not provide',
+                'Brake',
+                'when the aircraft lands',
+                Definition.get_all('H-1', 'H-2', lazy=True),
+            )
+            hazard = Hazard(
+                'H-1',
+                'Aircraft',
+                'violate minimum separation standards',
+                Definition.get_all('L-1', lazy=True),
+            )
+            reference = unsafe_control_action.hazards[0]
+
+            assert isinstance(reference, Reference)
+
+            self.assertEqual(
+                str(unsafe_control_action),
+                (
+                    'UCA-1: BSCU does not provide Brake when the aircraft'
+                    ' lands [H-1, H-2]'
+                ),
+            )
+            self.assertEqual(reference, hazard)
+            self.assertEqual(reference.system, 'Aircraft')
+            self.assertIs(reference.resolve(), hazard)
+            self.assertEqual(repr(deepcopy(reference)), 'H-1')
+            self.assertEqual(registry.get_dangling_names(), ['H-2', 'L-1'])
+            self.assertEqual(
+                registry.get_referrers('H-1'),
+                [unsafe_control_action],
+            )
+
+            with self.assertRaises(KeyError):
+                str(unsafe_control_action.hazards[1])
+
+            with self.assertRaisesRegex(ValueError, r"\['H-2', 'L-1'\]"):
+                registry.resolve_all()
+
+            loss = Loss('L-1', 'Loss of life or injury to people')
+            other_hazard = Hazard(
+                'H-2',
+                'Aircraft',
+                'airframe integrity is lost',
+                [loss],
+            )
+
+            self.assertEqual(registry.get_dangling_names(), [])
+            self.assertEqual(
+                registry.get_downstream('L-1'),
+                [hazard, other_hazard, unsafe_control_action],
+            )
+
+            registry.resolve_all()
+
+            self.assertEqual(
+                unsafe_control_action.hazards,
+                [hazard, other_hazard],
+            )
+            self.assertIs(unsafe_control_action.hazards[0], hazard)
+            self.assertIs(hazard.losses[0], loss)
+
+    def test_dangling_references(self) -> None:
+        with Registry().activate() as registry:
+            reference = Definition.get('L-9', lazy=True)
+            hazard = Hazard(
+                'H-1',
+                'Aircraft',
+                'violate minimum separation standards',
+                [reference],
+            )
+            sub_hazard = SubHazard(
+                'H-1.1',
+                Definition.get('H-9', lazy=True),
+                'Deceleration is low',
+            )
+
+            with self.assertWarnsRegex(UserWarning, 'already defined'):
+                other_sub_hazard = SubHazard(
+                    'H-1.1',
+                    Definition.get('H-9', lazy=True),
+                    'Deceleration is low',
+                )
+
+            self.assertNotEqual(reference, 1)
+            self.assertNotEqual(reference, hazard)
+            self.assertEqual(reference, Definition.get('L-9', lazy=True))
+            self.assertNotEqual(reference, Definition.get('L-8', lazy=True))
+            self.assertNotEqual(reference, Reference('L-9', Registry()))
+            self.assertIn(Definition.get('L-9', lazy=True), hazard.losses)
+            self.assertNotIn(1, hazard.losses)
+            self.assertEqual(sub_hazard, other_sub_hazard)
+            self.assertEqual(registry.get_dangling_names(), ['L-9', 'H-9'])
+
+            loss = Loss('L-9', 'Loss of life or injury to people')
+
+            self.assertEqual(reference, loss)
+            self.assertEqual(reference, Definition.get('L-9', lazy=True))
+
+    def test_bulk_create(self) -> None:
+        with Registry().activate() as registry:
+            with catch_warnings(record=True) as warning_messages:
+                simplefilter('always')
+
+                losses, diagnostics = Loss.bulk_create(
+                    [
+                        ('L-1', 'Loss of life or injury to people'),
+                        {'name': 'L-2', 'description': 'Loss of vehicle'},
+                        ('L-1', 'Loss of mission'),
+                        ('Loss 3', 'Loss of customer satisfaction'),
+                    ],
+                )
+
+                self.assertEqual(
+                    [loss.description for loss in losses],
+                    [
+                        'Loss of life or injury to people',
+                        'Loss of vehicle',
+                        'Loss of mission',
+                        'Loss of customer satisfaction',
+                    ],
+                )
+                self.assertIs(Definition.get('L-1'), losses[2])
+                self.assertEqual(len(registry), 3)
+                self.assertEqual(
+                    diagnostics,
+                    [
+                        Diagnostic(
+                            DiagnosticType.DUPLICATE_NAME,
+                            'L-1',
+                            "name 'L-1' is already defined",
+                        ),
+                        Diagnostic(
+                            DiagnosticType.NONSTANDARD_NAME,
+                            'Loss 3',
+                            (
+                                "name 'Loss 3' doesn't follow the standard"
+                                ' pattern'
+                            ),
+                        ),
+                    ],
+                )
+
+                with registry.defer_validation() as diagnostics:
+                    Hazard('H-1', 'Aircraft', 'airframe integrity is lost', [])
+                    Hazard('H-1', 'Aircraft', 'leaves the runway', [])
+
+                    self.assertEqual(diagnostics, [])
+
+                self.assertEqual(
+                    [diagnostic.diagnostic_type for diagnostic in diagnostics],
+                    [DiagnosticType.DUPLICATE_NAME],
+                )
+                self.assertEqual(warning_messages, [])
+
+                UnsafeControlAction.bulk_create(
+                    (
+                        f'UCA-{index}',
+                        'BSCU',
+                        'does not provide',
+                        'Brake',
+                        'when the aircraft lands',
+                        Definition.get_all('H-1'),
+                    )
+                    for index in range(1, 1001)
+                )
+
+                self.assertEqual(
+                    len(registry.get_downstream('H-1', UnsafeControlAction)),
+                    1000,
+                )
+
+                with self.assertWarnsRegex(UserWarning, 'standard pattern'):
+                    Loss('Loss 4', 'Environmental loss')
+
+    def test_threads(self) -> None:
+        def analyze(index: int) -> list[str]:
+            with Registry().activate() as registry:
+                losses = [
+                    Loss(f'L-{loss_index}', f'Loss {index}')
+                    for loss_index in range(1, 101)
+                ]
+                Hazard(
+                    'H-1',
+                    'Aircraft',
+                    'violate minimum separation standards',
+                    losses[:2],
+                )
+
+                self.assertEqual(len(registry), 101)
+                self.assertEqual(Definition.get_all('L-1'), losses[:1])
+
+                return [
+                    definition.description
+                    for definition in Definition.get_all('L-1', 'L-100')
+                    if isinstance(definition, Loss)
+                ]
+
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(analyze, range(32)))
+
+        self.assertEqual(
+            results,
+            [[f'Loss {index}'] * 2 for index in range(32)],
+        )
+
+    def test_tasks(self) -> None:
+        async def analyze(index: int) -> str:
+            with Registry().activate():
+                Loss('L-1', f'Loss {index}')
+
+                await sleep(0)
+
+                loss = Definition.get('L-1')
+
+                assert isinstance(loss, Loss)
+
+                return loss.description
+
+        async def main() -> list[str]:
+            return list(await gather(*map(analyze, range(8))))
+
+        self.assertEqual(
+            run(main()),
+            [f'Loss {index}' for index in range(8)],
+        )
@@ -9,12 +9,12 @@ from stpa.control_structures import (
     ControlType,
     Entity,
 )
-from stpa.definitions import Definition
+from stpa.definitions import Registry
 
 
 class ExamplesTestCase(TestCase):
-    def tearDown(self) -> None:
-        Definition.clear()
+    def setUp(self) -> None:
+        self.enterContext(Registry().activate())
 
 
 class STPAHandbookExamplesTestCase(ExamplesTestCase):
@@ -0,0 +1,121 @@
+from importlib import import_module
+from pathlib import Path
+from random import Random
+from unittest import TestCase
+from urllib.parse import unquote_to_bytes
+import xml.etree.ElementTree as ET
+
+from bs4 import BeautifulSoup
+
+from stpa.utilities import (
+    clean_html_text,
+    decode_uri_component,
+    HTML_PARSER,
+)
+
+
+class CleanHTMLTextTestCase(TestCase):
+    TOKENS = (
+        '',
+        ' ',
+        '\n',
+        'Brake',
+        'Arm and Set,',
+        '<',
+        '>',
+        '&',
+        '<div>',
+        '</div>',
+        '<br>',
+        '<br/>',
+        '</br>',
+        '<p style="line-height: 120%;">',
+        '</p>',
+        '<b>',
+        '</b>',
+        '&nbsp;',
+        '&amp;',
+        '&lt;',
+        '&nbsp',
+        '&nbspx',
+        '&unknown;',
+        '&#65;',
+        '&#x41;',
+        '&#150;',
+        '&#0;',
+        '&#1114112;',
+        '<!-- comment -->',
+        '<!DOCTYPE html>',
+        '<![CDATA[ data ]]>',
+        '<?pi?>',
+        '<script>text</script>',
+        '<rt>text</rt>',
+        '<style>',
+    )
+
+    def assertCleanedLikeSoup(self, html_text: str) -> None:
+        soup = BeautifulSoup(html_text, HTML_PARSER)
+
+        self.assertEqual(
+            clean_html_text(html_text),
+            soup.get_text(strip=True),
+            repr(html_text),
+        )
+
+    def test_examples(self) -> None:
+        examples = import_module('stpa.examples')
+        pathname = examples.__file__
+
+        assert isinstance(pathname, str)
+
+        for path in Path(pathname).parent.glob('**/*.drawio.xml'):
+            for cell in ET.parse(path).iter('mxCell'):
+                if 'value' in cell.attrib:
+                    self.assertCleanedLikeSoup(cell.attrib['value'])
+
+    def test_random_markup(self) -> None:
+        random = Random(0)
+
+        for _ in range(5000):
+            html_text = ''.join(
+                random.choices(self.TOKENS, k=random.randint(0, 10)),
+            )
+
+            self.assertCleanedLikeSoup(html_text)
+
+
+class DecodeURIComponentTestCase(TestCase):
+    TOKENS = (
+        b'',
+        b'a',
+        b' ',
+        b'\n',
+        b'\\',
+        b'\\x41',
+        b'\\n',
+        b'=',
+        b'%',
+        b'%%',
+        b'%2',
+        b'%20',
+        b'%4a',
+        b'%4A',
+        b'%4g',
+        b'%zz',
+        b'%5C',
+        b'%5cx41',
+        b'%E2%82%AC',
+    )
+
+    def test_random_text(self) -> None:
+        random = Random(0)
+
+        for _ in range(5000):
+            text = b''.join(
+                random.choices(self.TOKENS, k=random.randint(0, 10)),
+            )
+
+            self.assertEqual(
+                decode_uri_component(text),
+                unquote_to_bytes(text),
+            )
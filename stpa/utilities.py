@@ -1,9 +1,188 @@
+from base64 import b64decode, b64encode
+from codecs import escape_decode
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+from html.parser import HTMLParser
+from urllib.parse import quote_from_bytes, unquote_to_bytes
+from zlib import compressobj, decompress, MAX_WBITS
+
 from bs4 import BeautifulSoup
+from bs4.builder import HTMLTreeBuilder
+from bs4.dammit import EntitySubstitution
 
 HTML_PARSER = 'html.parser'
+HTML_TEXT_CACHE_SIZE = 4096
+_URI_COMPONENT_SAFE_CHARACTERS = '-_.!~*\'()'
+
+
+class _UnsupportedMarkupError(Exception):
+    pass
+
+
+class _HTMLTextParser(HTMLParser):
+    # Mirrors the string boundaries and reference handling of the
+    # ``html.parser`` tree builder of Beautiful Soup without building a tree.
+    # Tags whose strings Beautiful Soup excludes from ``get_text`` (e.g.
+    # ``script``) are left to Beautiful Soup itself.
+    _STRING_CONTAINER_TAG_NAMES = frozenset(
+        HTMLTreeBuilder.DEFAULT_STRING_CONTAINERS,
+    )
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=False)
+
+        self.data: list[str] = []
+        self.strings: list[str] = []
+
+    def flush(self) -> None:
+        string = ''.join(self.data).strip()
+
+        if string:
+            self.strings.append(string)
+
+        self.data.clear()
+
+    def get_text(self, html_text: str) -> str:
+        try:
+            self.feed(html_text)
+            self.close()
+        except AssertionError as error:
+            raise _UnsupportedMarkupError from error
+
+        self.flush()
+
+        return ''.join(self.strings)
+
+    def handle_starttag(
+            self,
+            tag: str,
+            attrs: list[tuple[str, str | None]],
+    ) -> None:
+        if tag in self._STRING_CONTAINER_TAG_NAMES:
+            raise _UnsupportedMarkupError
+
+        self.flush()
+
+    def handle_endtag(self, tag: str) -> None:
+        self.flush()
+
+    def handle_data(self, data: str) -> None:
+        self.data.append(data)
+
+    def handle_charref(self, name: str) -> None:
+        if name.startswith(('x', 'X')):
+            code_point = int(name[1:], 16)
+        else:
+            code_point = int(name)
+
+        data = ''
+
+        if code_point < 256:
+            try:
+                data = bytes([code_point]).decode('windows-1252')
+            except UnicodeDecodeError:
+                pass
+
+        if not data:
+            try:
+                data = chr(code_point)
+            except (ValueError, OverflowError):
+                pass
+
+        self.handle_data(data or '\N{REPLACEMENT CHARACTER}')
+
+    def handle_entityref(self, name: str) -> None:
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+
+        self.handle_data(f'&{name}' if character is None else character)
+
+    def handle_comment(self, data: str) -> None:
+        self.flush()
+
+    def handle_decl(self, decl: str) -> None:
+        self.flush()
 
+    def handle_pi(self, data: str) -> None:
+        self.flush()
 
+    def unknown_decl(self, data: str) -> None:
+        self.flush()
+
+        if data.upper().startswith('CDATA['):
+            self.handle_data(data[len('CDATA['):])
+            self.flush()
+
+
+@lru_cache(maxsize=HTML_TEXT_CACHE_SIZE)
 def clean_html_text(html_text: str) -> str:
+    if '<' not in html_text and '&' not in html_text:
+        return html_text.strip()
+
+    try:
+        return _HTMLTextParser().get_text(html_text)
+    except _UnsupportedMarkupError:
+        pass
+
     soup = BeautifulSoup(html_text, HTML_PARSER)
 
     return soup.get_text(strip=True)
+
+
+def compress_diagram_chunks(chunks: Iterable[bytes]) -> Iterator[str]:
+    compressor = compressobj(wbits=-MAX_WBITS)
+    pending = b''
+
+    for chunk in chunks:
+        quoted_chunk = quote_from_bytes(chunk, _URI_COMPONENT_SAFE_CHARACTERS)
+        pending += compressor.compress(quoted_chunk.encode())
+        # Base64 maps every 3 bytes to 4 characters, so whole groups can be
+        # emitted before the rest of the stream is known.
+        size = len(pending) - len(pending) % 3
+
+        if size:
+            yield b64encode(pending[:size]).decode()
+
+            pending = pending[size:]
+
+    pending += compressor.flush()
+
+    yield b64encode(pending).decode()
+
+
+def compress_diagram(model: bytes) -> str:
+    return ''.join(compress_diagram_chunks((model,)))
+
+
+def decode_uri_component(text: bytes) -> bytes:
+    # Turning every escape into a ``\x`` escape lets the C codec decode the
+    # whole text at once, which is far faster than ``unquote_to_bytes``.
+    # Malformed escapes, which the codec rejects, fall back to the latter.
+    try:
+        decoded_text, _ = escape_decode(
+            text.replace(b'\\', b'\\\\').replace(b'%', b'\\x'),
+        )
+    except ValueError:
+        decoded_text = unquote_to_bytes(text)
+
+    return decoded_text
+
+
+def decompress_diagram(text: str) -> bytes:
+    model = decompress(b64decode(text), -MAX_WBITS)
+
+    if not model.startswith(b'<'):
+        model = decode_uri_component(model)
+
+    return model
+
+
+def parse_style(style: str) -> dict[str, str]:
+    items = {}
+
+    for item in style.split(';'):
+        key, _, value = item.partition('=')
+
+        if key:
+            items[key] = value
+
+    return items